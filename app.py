@@ -1,24 +1,23 @@
 import streamlit as st
+import hashlib
 import tempfile
+import time
+import os
+import threading
+from types import SimpleNamespace
 from pathlib import Path
 from typing import Any
 import logging
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 
-# Import custom modules
-from modules.file_handler import ExcelFileHandler
-from modules.step1_processor import TemplateConverter
-from modules.step2_processor import Step2Processor
-from modules.step3_data_transfer import Step3DataTransfer
-from modules.step4_duplicate_remover import Step4DuplicateRemover
+# Import custom modules; the pandas/openpyxl-backed ones (file handler, core
+# pipeline) are imported on first use so the page renders before they load
 from modules.exporter import FileExporter
 from utils.validators import FileValidator
 
 # Import TSS UI Kit
 from modules.tss_ui_kit import TSSUIKit, create_config, get_step_config
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-
 # Page configuration
 st.set_page_config(
     page_title="Excel TSS Converter",
@@ -41,9 +40,170 @@ def initialize_ui_kit():
     ui = TSSUIKit(config.export_config())
     return ui, config
 
-def load_custom_css():
-    """Load custom CSS styling for the app"""
-    st.markdown("""
+@st.cache_resource
+def get_pipeline() -> SimpleNamespace:
+    """Create the processing components once per server process"""
+    from modules.core import CorePipeline
+    
+    return SimpleNamespace(
+        validator=FileValidator(),
+        core=CorePipeline(),
+        exporter=FileExporter()
+    )
+
+@st.cache_resource
+def get_result_store() -> dict:
+    """
+    Server-wide map of result key (see get_result_key) -> finished ZIP path
+    
+    An in-process index over the archives in RESULTS_DIR; those files are
+    named by digest (get_result_path), so they also survive restarts.
+    
+    A plain dict in st.cache_resource rather than st.cache_data around the
+    pipeline: the pipeline drives a progress bar created outside it, which
+    cached functions cannot replay.
+    """
+    return {}
+
+# Finished archives live in their own directory so the cleanup scheduler
+# never touches unrelated files in the system temp dir
+RESULTS_DIR = Path(tempfile.gettempdir()) / "tss_converter"
+RESULT_MAX_AGE_HOURS = 6
+CLEANUP_INTERVAL_SECONDS = 3600
+# Bump whenever a code change alters the converted output, so archives
+# persisted in RESULTS_DIR by an older deploy are no longer served
+APP_VERSION = "2"
+
+def get_result_key(file_hash: str, filename: str) -> tuple:
+    """
+    Cache key of a finished archive: upload content and name, the loaded
+    configuration and the app version, so a config change or redeploy never
+    serves an archive built by different rules
+    """
+    from modules.core import ConfigManager
+    
+    config_fingerprint = ConfigManager.get_config_fingerprint(get_pipeline().core.config_dir)
+    return (file_hash, filename, config_fingerprint, APP_VERSION)
+
+def get_result_path(result_key: tuple) -> Path:
+    """Deterministic on-disk location of the finished ZIP for a result key"""
+    file_hash, *rest = result_key
+    rest_hash = hashlib.blake2b("\0".join(rest).encode("utf-8"), digest_size=8).hexdigest()
+    return RESULTS_DIR / f"{file_hash}_{rest_hash}.zip"
+
+@st.cache_resource
+def start_cleanup_scheduler() -> threading.Timer:
+    """
+    Start one background timer per server process that expires old archives
+    
+    Cleanup runs off the request path: the timer re-arms itself after each
+    pass, deletes stale ZIPs and drops result-store entries whose file is gone.
+    """
+    exporter = get_pipeline().exporter
+    result_store = get_result_store()
+    
+    def run_cleanup():
+        removed = exporter.cleanup_old_files(RESULTS_DIR, RESULT_MAX_AGE_HOURS, ('.zip',))
+        for key, path in list(result_store.items()):
+            if not os.path.exists(path):
+                result_store.pop(key, None)
+        if removed:
+            logging.info("Removed %d expired archive(s) from %s", removed, RESULTS_DIR)
+        schedule()
+    
+    def schedule():
+        timer = threading.Timer(CLEANUP_INTERVAL_SECONDS, run_cleanup)
+        timer.daemon = True
+        timer.start()
+        return timer
+    
+    return schedule()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_excel_sheets(file_hash: str, _uploaded_file) -> dict:
+    """
+    Parse every sheet of the upload once, cached by content hash
+    
+    The uploaded file itself is excluded from hashing (leading underscore);
+    file_hash identifies the content so re-runs and re-uploads of the same
+    workbook skip parsing entirely.
+    """
+    from modules.file_handler import ExcelFileHandler
+    
+    return ExcelFileHandler().read_excel_sheets(_uploaded_file, header=None)
+
+def throttled_progress(progress_bar, min_interval: float = 0.1):
+    """
+    Build a progress_callback(done, total) that updates the bar at most every
+    min_interval seconds, always drawing the final state
+    """
+    last_update = [0.0]
+    
+    def update(done: int, total: int):
+        now = time.monotonic()
+        if done == total or now - last_update[0] >= min_interval:
+            last_update[0] = now
+            progress_bar.progress(done / total)
+    
+    return update
+
+HASH_CHUNK_SIZE = 1 << 20
+
+def compute_file_hash(uploaded_file) -> str:
+    """
+    Content digest used as the cache key for parsed sheets and results
+    
+    BLAKE2b is streamed over a memoryview of the upload buffer in 1 MB
+    chunks, so no copy of the file is made. The digest is remembered per
+    file_id in session state and computed once per upload, not per rerun.
+    """
+    file_id = getattr(uploaded_file, 'file_id', None)
+    digests = st.session_state.setdefault('file_digests', {})
+    if file_id is not None and file_id in digests:
+        return digests[file_id]
+    
+    hasher = hashlib.blake2b(digest_size=16)
+    with memoryview(uploaded_file.getbuffer()) as view:
+        for start in range(0, len(view), HASH_CHUNK_SIZE):
+            hasher.update(view[start:start + HASH_CHUNK_SIZE])
+    digest = hasher.hexdigest()
+    
+    if file_id is not None:
+        # Only the current upload matters; drop digests of replaced files
+        digests.clear()
+        digests[file_id] = digest
+    return digest
+
+def prewarm_excel_sheets(uploaded_file):
+    """
+    Parse a fresh upload in a background thread while the user is idle
+    
+    Fills the same load_excel_sheets and get_pipeline caches the Start
+    Conversion handler uses, so the click usually finds the sheets parsed
+    and the processing components already built. Started once per
+    uploaded file per session; failures are left for the real run to report.
+    """
+    file_id = getattr(uploaded_file, 'file_id', uploaded_file.name)
+    if st.session_state.get('prewarm_file_id') == file_id:
+        return
+    st.session_state.prewarm_file_id = file_id
+    
+    def warm():
+        try:
+            # Also import openpyxl/the core steps and build the Step 1
+            # prototype now, so the first click does not pay for them
+            get_pipeline()
+            load_excel_sheets(compute_file_hash(uploaded_file), uploaded_file)
+        except Exception as e:
+            logging.debug("Background parse failed: %s", e)
+    
+    thread = threading.Thread(target=warm, daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
+
+
+# Stylesheet for load_custom_css()
+_CUSTOM_CSS = """
         <style>
         /* Import Roboto Font */
         @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;500;700&display=swap');
@@ -402,7 +562,14 @@ def load_custom_css():
         }
         
         </style>
-    """, unsafe_allow_html=True)
+    """
+
+
+def load_custom_css():
+    """Load custom CSS styling for the app"""
+    # Streamlit drops elements that are not re-emitted on a rerun, so this
+    # must run every time; gating it on session_state would unstyle the page
+    st.markdown(_CUSTOM_CSS, unsafe_allow_html=True)
 
 
 def display_header(ui: TSSUIKit):
@@ -435,14 +602,41 @@ def display_upload_section(ui: TSSUIKit):
     
     if uploaded_file is not None:
         # Show file info using TSS UI Kit styling
-        file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
+        file_size_mb = uploaded_file.size / (1024 * 1024)
         ui.render_info_message(f"File uploaded: {uploaded_file.name} ({file_size_mb:.1f}MB)")
+        
+        # Start parsing while the user reaches for the button
+        prewarm_excel_sheets(uploaded_file)
     
     return uploaded_file
 
 
+def display_download(ui: TSSUIKit, uploaded_file, zip_path: str, failed_sheets=()):
+    """Show the outcome message and download section for a finished archive"""
+    if failed_sheets:
+        ui.render_warning_message(
+            f"Conversion finished, but these sheets failed: {', '.join(failed_sheets)}"
+        )
+    else:
+        ui.render_success_message("Conversion completed successfully!")
+    ui.render_download_section(
+        file_path=zip_path,
+        original_filename=uploaded_file.name,
+        custom_filename=f"{Path(uploaded_file.name).stem}_TSS_Converted.zip"
+    )
+
+
+def configure_logging():
+    """Configure root logging: verbose only when TSS_DEBUG is set"""
+    level = logging.DEBUG if os.getenv("TSS_DEBUG") else logging.WARNING
+    logging.basicConfig(level=level)
+
+
 def main():
     """Main application function"""
+    configure_logging()
+    start_cleanup_scheduler()
+    
     # Initialize TSS UI Kit
     ui, _ = initialize_ui_kit()
     
@@ -474,26 +668,46 @@ def main():
         
         if start_conversion:
             try:
-                # Initialize components
-                file_handler = ExcelFileHandler()
-                validator = FileValidator()
-                converter = TemplateConverter()
-                step2_processor = Step2Processor()
-                step3_processor = Step3DataTransfer()
-                step4_processor = Step4DuplicateRemover()
-                exporter = FileExporter()
+                pipeline = get_pipeline()
                 
                 # Validate file
                 with st.spinner("Validating file..."):
-                    is_valid, validation_message = validator.validate_excel_file(uploaded_file)
+                    is_valid, validation_message = pipeline.validator.validate_excel_file(uploaded_file)
                 
                 if not is_valid:
                     ui.render_error_message(f"File validation failed: {validation_message}")
                     return
                 
-                # Process file
+                file_hash = compute_file_hash(uploaded_file)
+                
+                # Identical upload already converted: serve the existing archive
+                result_store = get_result_store()
+                result_key = get_result_key(file_hash, uploaded_file.name)
+                cached_zip_path = result_store.get(result_key)
+                if not (cached_zip_path and os.path.exists(cached_zip_path)):
+                    # Archives are named by a digest of the result key, so one
+                    # written before a server restart is still found on disk
+                    result_path = get_result_path(result_key)
+                    cached_zip_path = str(result_path) if result_path.exists() else None
+                if cached_zip_path:
+                    # Touch on hit so the cleanup scheduler expires least-recently-used
+                    # archives; the timer may have removed it since the exists() check
+                    try:
+                        os.utime(cached_zip_path)
+                    except FileNotFoundError:
+                        result_store.pop(result_key, None)
+                        cached_zip_path = None
+                if cached_zip_path:
+                    result_store[result_key] = cached_zip_path
+                    st.session_state.last_run_key = result_key
+                    st.session_state.last_zip_path = cached_zip_path
+                    st.session_state.last_failed_sheets = []
+                    display_download(ui, uploaded_file, cached_zip_path)
+                    return
+                
+                # Parse the workbook once per upload; every step reuses these DataFrames
                 with st.spinner("Reading Excel file..."):
-                    sheets_data = file_handler.read_excel_sheets(uploaded_file)
+                    sheets_data = load_excel_sheets(file_hash, uploaded_file)
                 
                 # Show non-empty sheets
                 non_empty_sheets = [name for name, df in sheets_data.items() if not df.empty]
@@ -502,68 +716,62 @@ def main():
                     ui.render_warning_message("No non-empty sheets found in the uploaded file.")
                     return
                 
-                # Start processing with single progress tracker
-                with st.spinner("Processing files..."):
-                    # Create single progress bar
+                # Single status widget: one progress bar, label updated at the end
+                with st.status("Processing files...", expanded=True) as status:
                     progress_bar = st.progress(0)
-                    status_text = st.empty()
                     
-                    # Step 1: Create templates first
-                    status_text.info("⏳ Step 1: Creating template files...")
-                    converter = TemplateConverter()
-                    processed_files = []
-                    for sheet_name in non_empty_sheets:
-                        template_file = converter.create_template_for_sheet(sheet_name, uploaded_file.name)
-                        if template_file:
-                            base_name = Path(uploaded_file.name).stem
-                            processed_files.append({
-                                'sheet_name': sheet_name,
-                                'filename': f"{base_name} - {sheet_name} - Step1.xlsx",
-                                'file_path': template_file
-                            })
-                    progress_bar.progress(0.25)
-                    status_text.success("✅ Step 1: Template creation completed")
-                    
-                    # Step 2: Data Processing
-                    status_text.info("⏳ Step 2: Processing data...")
-                    step2_results = step2_processor.process_multiple_sheets_to_step2(uploaded_file, processed_files)
-                    progress_bar.progress(0.5)
-                    status_text.success("✅ Step 2: Data processing completed")
+                    # Steps 1-4 run fused per sheet; Step 4 outputs stay in memory until zipped
+                    step4_results = pipeline.core.process_sheets(
+                        sheets_data,
+                        uploaded_file.name,
+                        sheet_names=non_empty_sheets,
+                        progress_callback=throttled_progress(progress_bar),
+                        in_memory=True
+                    )
+                    status.update(label="✅ Conversion steps completed", state="complete", expanded=False)
+                
+                failed_sheets = step4_results['failed_sheets']
+                if step4_results['step4_files']:
+                    # Stream the archive into a partial file, then move it into
+                    # place so concurrent sessions never serve a half-written ZIP
+                    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+                    with tempfile.NamedTemporaryFile(delete=False, suffix='.partial.zip', dir=RESULTS_DIR) as tmp_file:
+                        temp_file_path = tmp_file.name
+                    if failed_sheets:
+                        # A partial result is served once from its own temporary
+                        # name and never cached, so the next upload retries
+                        zip_path = temp_file_path[:-len('.partial.zip')] + '.zip'
+                    else:
+                        zip_path = str(get_result_path(result_key))
+                    try:
+                        pipeline.exporter.write_zip(step4_results['step4_files'], temp_file_path)
+                        os.replace(temp_file_path, zip_path)
+                    except Exception:
+                        # Never leave a half-written archive behind in RESULTS_DIR
+                        Path(temp_file_path).unlink(missing_ok=True)
+                        raise
+                    if not failed_sheets:
+                        result_store[result_key] = zip_path
+                    st.session_state.last_run_key = result_key
+                    st.session_state.last_zip_path = zip_path
+                    st.session_state.last_failed_sheets = failed_sheets
                     
-                    if step2_results['step2_files']:
-                        # Step 3: Data Transfer
-                        status_text.info("⏳ Step 3: Transferring data...")
-                        step3_results = step3_processor.process_multiple_sheets_to_step3(uploaded_file, step2_results['step2_files'])
-                        progress_bar.progress(0.75)
-                        status_text.success("✅ Step 3: Data transfer completed")
-                        
-                        if step3_results['step3_files']:
-                            # Step 4: Duplicate Removal
-                            status_text.info("⏳ Step 4: Removing duplicates...")
-                            step4_results = step4_processor.process_multiple_sheets_to_step4(step3_results['step3_files'])
-                            progress_bar.progress(1.0)
-                            status_text.success("✅ Step 4: Duplicate removal completed")
-                            
-                            if step4_results['step4_files']:
-                                # Create download using TSS UI Kit
-                                zip_buffer = exporter.create_zip_download(step4_results['step4_files'])
-                                
-                                # Save to temporary file for TSS UI Kit download
-                                with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-                                    tmp_file.write(zip_buffer)
-                                    temp_file_path = tmp_file.name
-                                
-                                ui.render_success_message("Conversion completed successfully!")
-                                
-                                # Use TSS UI Kit download section
-                                ui.render_download_section(
-                                    file_path=temp_file_path,
-                                    original_filename=uploaded_file.name,
-                                    custom_filename=f"{Path(uploaded_file.name).stem}_TSS_Converted.zip"
-                                )
+                    display_download(ui, uploaded_file, zip_path, failed_sheets)
+                else:
+                    ui.render_error_message(f"No sheets could be converted: {', '.join(failed_sheets)}")
             except Exception as process_error:
                 ui.render_error_message(f"Error during processing: {str(process_error)}")
                 logging.error(f"Processing error: {str(process_error)}")
+        
+        elif 'last_run_key' in st.session_state:
+            # Unrelated rerun (e.g. the download click): re-show the finished
+            # result for this upload instead of dropping it or reconverting
+            last_zip_path = st.session_state.last_zip_path
+            file_hash = compute_file_hash(uploaded_file)
+            if (st.session_state.last_run_key == get_result_key(file_hash, uploaded_file.name)
+                    and os.path.exists(last_zip_path)):
+                display_download(ui, uploaded_file, last_zip_path,
+                                 st.session_state.get('last_failed_sheets', []))
     
 
 if __name__ == "__main__":
@@ -8,6 +8,10 @@ Each module contains one class:
   step3           →  CoreStep3DataTransfer
   step4           →  CoreStep4DuplicateRemover
   pipeline        →  CorePipeline  (orchestrates all steps)
+  parallel        →  run_per_sheet / iter_per_sheet (thread-pool helpers for per-sheet work)
+  workbook_io     →  workbook_to_bytes / load_workbook_bytes / ensure_output_dir / COL_LETTERS /
+                   read_sheet_frame / clear_sheet_cache (parsed-sheet cache) /
+                   close_read_only_workbooks
 """
 
 from .config_manager import ConfigManager
@@ -16,6 +20,16 @@ from .step2 import CoreStep2Processor
 from .step3 import CoreStep3DataTransfer
 from .step4 import CoreStep4DuplicateRemover
 from .pipeline import CorePipeline
+from .parallel import iter_per_sheet, run_per_sheet
+from .workbook_io import (
+    COL_LETTERS,
+    clear_sheet_cache,
+    close_read_only_workbooks,
+    ensure_output_dir,
+    load_workbook_bytes,
+    read_sheet_frame,
+    workbook_to_bytes,
+)
 
 __all__ = [
     "ConfigManager",
@@ -24,4 +38,13 @@ __all__ = [
     "CoreStep3DataTransfer",
     "CoreStep4DuplicateRemover",
     "CorePipeline",
+    "run_per_sheet",
+    "iter_per_sheet",
+    "load_workbook_bytes",
+    "workbook_to_bytes",
+    "ensure_output_dir",
+    "COL_LETTERS",
+    "read_sheet_frame",
+    "clear_sheet_cache",
+    "close_read_only_workbooks",
 ]
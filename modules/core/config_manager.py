@@ -1,56 +1,81 @@
 """Configuration manager for the TSS pipeline."""
 
+import hashlib
 import json
 import logging
+import threading
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def _load_json(config_path: Path) -> Dict[str, Any]:
+    """Parse a JSON config file, with orjson when it is installed."""
+    data = config_path.read_bytes()
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 class ConfigManager:
-    """Manages configuration loading and caching"""
+    """Manages configuration loading and caching, one cached dict per config file"""
+
+    # modules/core/ → modules/ → project_root/ → config/
+    DEFAULT_CONFIG_DIR = Path(__file__).parent.parent.parent / "config"
+
+    _configs: Dict[Path, Dict[str, Any]] = {}
+    _lock = threading.Lock()
 
-    _template_config = None
-    _processing_config = None
+    @classmethod
+    def _config_path(cls, config_dir: Optional[str], filename: str) -> Path:
+        """Resolved path of a config file, so None and the default dir share a cache entry."""
+        return (Path(config_dir) if config_dir else cls.DEFAULT_CONFIG_DIR).resolve() / filename
+
+    @classmethod
+    def _get_config(cls, config_dir: Optional[str], filename: str, label: str) -> Dict[str, Any]:
+        """Load a config file once per resolved path; safe to call from worker threads."""
+        config_path = cls._config_path(config_dir, filename)
+        config = cls._configs.get(config_path)
+        if config is not None:
+            return config
+
+        with cls._lock:
+            config = cls._configs.get(config_path)
+            if config is None:
+                try:
+                    config = _load_json(config_path)
+                except Exception as e:
+                    logger.error("Failed to load %s config: %s", label, e)
+                    raise
+                cls._configs[config_path] = config
+        return config
 
     @classmethod
     def get_template_config(cls, config_dir: Optional[str] = None) -> Dict[str, Any]:
         """Load template configuration from JSON file"""
-        if cls._template_config is None:
-            if config_dir:
-                config_path = Path(config_dir) / "template_config.json"
-            else:
-                # modules/core/ → modules/ → project_root/ → config/
-                config_path = Path(__file__).parent.parent.parent / "config" / "template_config.json"
-
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    cls._template_config = json.load(f)
-            except Exception as e:
-                logging.error(f"Failed to load template config: {e}")
-                raise
-
-        return cls._template_config
+        return cls._get_config(config_dir, "template_config.json", "template")
 
     @classmethod
     def get_processing_config(cls, config_dir: Optional[str] = None) -> Dict[str, Any]:
         """Load processing configuration from JSON file"""
-        if cls._processing_config is None:
-            if config_dir:
-                config_path = Path(config_dir) / "processing_config.json"
-            else:
-                config_path = Path(__file__).parent.parent.parent / "config" / "processing_config.json"
-
-            try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    cls._processing_config = json.load(f)
-            except Exception as e:
-                logging.error(f"Failed to load processing config: {e}")
-                raise
+        return cls._get_config(config_dir, "processing_config.json", "processing")
 
-        return cls._processing_config
+    @classmethod
+    def get_config_fingerprint(cls, config_dir: Optional[str] = None) -> str:
+        """Short digest of the loaded template and processing configs, for keying cached results"""
+        configs = [cls.get_template_config(config_dir), cls.get_processing_config(config_dir)]
+        data = json.dumps(configs, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.blake2b(data, digest_size=8).hexdigest()
 
     @classmethod
     def reload_configs(cls):
         """Force reload of configurations"""
-        cls._template_config = None
-        cls._processing_config = None
+        with cls._lock:
+            cls._configs.clear()
@@ -0,0 +1,82 @@
+"""Parallel helpers — fan independent per-sheet work out to a thread (or process) pool."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bound on per-sheet worker threads; openpyxl work is mostly pure Python,
+# so threads beyond a handful only add contention
+MAX_SHEET_WORKERS = 8
+
+
+def iter_per_sheet(
+    func: Callable[[Any], Any],
+    items: Sequence[Any],
+    max_workers: Optional[int] = None,
+    use_processes: bool = False,
+) -> Iterator[Tuple[int, Any, Optional[Exception]]]:
+    """
+    Run ``func`` on every item in a thread pool, yielding as items finish.
+
+    Yields ``(index, result, error)`` in completion order, so callers can
+    report progress or stream results while the remaining items run. The
+    generator is consumed in the calling thread; workers never touch it.
+
+    With ``use_processes=True`` a process pool is used instead, so CPU-bound
+    pure-Python work is not serialized by the GIL. ``func``, the items and
+    the results must then be picklable (``func`` at module level).
+    """
+    total = len(items)
+    if total == 0:
+        return
+
+    if max_workers is None:
+        max_workers = min(MAX_SHEET_WORKERS, os.cpu_count() or 1, total)
+
+    if max_workers <= 1:
+        for index, item in enumerate(items):
+            try:
+                yield index, func(item), None
+            except Exception as e:
+                yield index, None, e
+        return
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        futures = {executor.submit(func, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+def run_per_sheet(
+    func: Callable[[Any], Any],
+    items: Sequence[Any],
+    max_workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    use_processes: bool = False,
+) -> List[Tuple[Any, Optional[Exception]]]:
+    """
+    Run ``func`` on every item in a thread pool.
+
+    Sheets are independent and openpyxl/pandas spend most of their time in
+    zlib/XML C code, so threads overlap well without pickling workbooks.
+    Workers never touch Streamlit; ``progress_callback(done, total)`` is
+    called from the calling thread as each item finishes, so it may safely
+    update UI elements.
+
+    ``use_processes`` is passed through to iter_per_sheet.
+
+    Returns a list of ``(result, error)`` pairs in the same order as ``items``.
+    """
+    total = len(items)
+    outcomes: List[Tuple[Any, Optional[Exception]]] = [(None, None)] * total
+
+    for done, (index, result, error) in enumerate(iter_per_sheet(func, items, max_workers, use_processes), start=1):
+        outcomes[index] = (result, error)
+        if progress_callback:
+            progress_callback(done, total)
+
+    return outcomes
@@ -1,16 +1,53 @@
 """Pipeline orchestrator — used by test scripts and CLI runners."""
 
+import io
 import logging
+import pickle
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from streamlit.runtime.uploaded_file_manager import UploadedFile
+import openpyxl
+import pandas as pd
 
 from .config_manager import ConfigManager
 from .step1 import CoreTemplateCreator
 from .step2 import CoreStep2Processor
 from .step3 import CoreStep3DataTransfer
 from .step4 import CoreStep4DuplicateRemover
+from .parallel import run_per_sheet
+from .workbook_io import (
+    clear_sheet_cache,
+    close_read_only_workbooks,
+    ensure_output_dir,
+    workbook_to_bytes,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pipelines built inside process-pool workers, one per (output_dir, config_dir)
+_worker_pipelines: Dict[Tuple[Optional[str], Optional[str]], "CorePipeline"] = {}
+
+
+def _process_sheet_in_worker(
+    output_dir: Optional[str],
+    config_dir: Optional[str],
+    original_filename: str,
+    keep_intermediates: bool,
+    in_memory: bool,
+    item: Tuple[str, pd.DataFrame],
+) -> Dict[str, Any]:
+    """Process-pool entry point: run one sheet on this worker's own CorePipeline."""
+    key = (output_dir, config_dir)
+    pipeline = _worker_pipelines.get(key)
+    if pipeline is None:
+        pipeline = _worker_pipelines[key] = CorePipeline(output_dir, config_dir)
+    sheet_name, df = item
+    return pipeline.process_sheet(
+        sheet_name, df, original_filename,
+        keep_intermediates=keep_intermediates, in_memory=in_memory
+    )
 
 
 class CorePipeline:
@@ -25,9 +62,128 @@ class CorePipeline:
         self.step4_processor = CoreStep4DuplicateRemover(output_dir, config_dir)
 
     def process_complete_pipeline(
-        self, source_file, sheet_names: List[str]
+        self, source_file, sheet_names: List[str], use_processes: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Run the complete pipeline for multiple sheets.
+
+        The source workbook is parsed once up front; every sheet then runs the
+        fused Step 1→4 pass. Step 1-3 files are still written next to the
+        Step 4 output for inspection by the CLI/test scripts.
+
+        Sheets run in a process pool by default: the per-sheet work is
+        CPU-bound openpyxl code, so threads would share one core. Pass
+        use_processes=False to stay on threads.
+        """
+        original_filename = (
+            Path(source_file).name if isinstance(source_file, str) else source_file.name
+        )
+        sheets_data = self._read_source_sheets(source_file, sheet_names)
+
+        return self.process_sheets(
+            sheets_data, original_filename, sheet_names=sheet_names, keep_intermediates=True,
+            use_processes=use_processes
+        )
+
+    def _read_source_sheets(self, source_file, sheet_names: List[str]) -> Dict[str, pd.DataFrame]:
+        """Parse the requested sheets (header=None) from one open workbook handle."""
+        source = source_file if isinstance(source_file, str) else io.BytesIO(source_file.getvalue())
+        with pd.ExcelFile(source) as excel_file:
+            available = set(excel_file.sheet_names)
+            return {
+                sheet_name: excel_file.parse(sheet_name, header=None)
+                for sheet_name in sheet_names
+                if sheet_name in available
+            }
+
+    def process_sheet(
+        self,
+        sheet_name: str,
+        df: pd.DataFrame,
+        original_filename: str,
+        keep_intermediates: bool = False,
+        in_memory: bool = False,
     ) -> Dict[str, Any]:
-        """Run the complete pipeline for multiple sheets."""
+        """
+        Run Steps 1→4 for one sheet on a single in-memory workbook.
+
+        Only the Step 4 file is written; the Step 1-3 workbooks are never
+        saved and re-opened. Pass keep_intermediates=True to also save them
+        (useful when debugging a step).
+
+        Args:
+            sheet_name: Name of the source sheet
+            df: Source sheet DataFrame (header=None)
+            original_filename: Uploaded/source filename, used for output naming
+            in_memory: Return the Step 4 workbook as bytes under 'data'
+                instead of saving it to the output directory
+
+        Returns:
+            File entry dict with 'sheet_name', 'filename' and either
+            'file_path' or 'data'
+        """
+        if keep_intermediates or not in_memory:
+            ensure_output_dir(self.step4_processor.output_dir)
+
+        step4_path = self._get_output_path("step4", original_filename, sheet_name)
+        # Steps 1-3 run in a helper so their working workbook is freed on return,
+        # before the Step 4 workbook is serialized
+        step4_wb = self._build_step4_workbook(sheet_name, df, original_filename, keep_intermediates)
+        file_entry: Dict[str, Any] = {
+            'sheet_name': sheet_name,
+            'filename': Path(step4_path).name,
+            'file_path': None
+        }
+
+        if in_memory:
+            file_entry['data'] = workbook_to_bytes(step4_wb)
+        else:
+            step4_wb.save(step4_path)
+            file_entry['file_path'] = step4_path
+            logger.info("Created Step 4 file: %s", step4_path)
+
+        return file_entry
+
+    def _build_step4_workbook(
+        self, sheet_name: str, df: pd.DataFrame, original_filename: str, keep_intermediates: bool
+    ) -> openpyxl.Workbook:
+        """Run Steps 1-3 on one working workbook and return the Step 4 workbook built from it."""
+        wb = self.template_creator.build_template_workbook()
+        if keep_intermediates:
+            wb.save(self._get_output_path("step1", original_filename, sheet_name))
+
+        article_names, article_numbers = self.step2_processor.extract_article_info_from_dataframe(df)
+        self.step2_processor.populate_worksheet(wb.active, article_names, article_numbers)
+        if keep_intermediates:
+            wb.save(self._get_output_path("step2", original_filename, sheet_name))
+
+        self.step3_processor.transfer_to_worksheet(wb.active, df, sheet_name)
+        if keep_intermediates:
+            wb.save(self._get_output_path("step3", original_filename, sheet_name))
+
+        return self.step4_processor.build_deduplicated_workbook(wb.active)
+
+    def process_sheets(
+        self,
+        sheets_data: Dict[str, pd.DataFrame],
+        original_filename: str,
+        sheet_names: Optional[List[str]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        in_memory: bool = False,
+        keep_intermediates: bool = False,
+        use_processes: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Run the fused pipeline for already-parsed sheets, one worker per sheet.
+
+        With use_processes=True each sheet runs in a worker process on its own
+        CorePipeline built from this pipeline's output/config dirs. Sheets the
+        process pool could not run (broken pool, unpicklable data) are retried
+        on threads, so the result never depends on the pool being available.
+        """
+        if sheet_names is None:
+            sheet_names = list(sheets_data.keys())
+
         results: Dict[str, Any] = {
             'success_count': 0,
             'failed_count': 0,
@@ -36,52 +192,63 @@ class CorePipeline:
             'total_sheets': len(sheet_names)
         }
 
-        original_filename = (
-            Path(source_file).name if isinstance(source_file, str) else source_file.name
-        )
+        def run_in_thread(sheet_name: str) -> Dict[str, Any]:
+            return self.process_sheet(
+                sheet_name, sheets_data[sheet_name], original_filename,
+                keep_intermediates=keep_intermediates, in_memory=in_memory
+            )
 
-        for sheet_name in sheet_names:
-            try:
-                template_path = self.template_creator.create_template(sheet_name, original_filename)
-                if not template_path:
-                    raise Exception("Failed to create template")
-
-                if isinstance(source_file, UploadedFile):
-                    article_name, article_number = (
-                        self.step2_processor.extract_article_info_from_uploaded_file(
-                            source_file, sheet_name
-                        )
-                    )
-                else:
-                    article_name, article_number = (
-                        self.step2_processor.extract_article_info_from_file(
-                            source_file, sheet_name
-                        )
+        # A single sheet gains nothing from a pool it would have to start
+        if use_processes and len(sheet_names) > 1:
+            # Sheets missing from sheets_data fail on their own, as on the thread path
+            pool_outcomes = iter(run_per_sheet(
+                partial(
+                    _process_sheet_in_worker, self.output_dir, self.config_dir,
+                    original_filename, keep_intermediates, in_memory
+                ),
+                [(sheet_name, sheets_data[sheet_name]) for sheet_name in sheet_names if sheet_name in sheets_data],
+                progress_callback=progress_callback,
+                use_processes=True,
+            ))
+            outcomes = [
+                next(pool_outcomes) if sheet_name in sheets_data else (None, KeyError(sheet_name))
+                for sheet_name in sheet_names
+            ]
+            for index, (_, error) in enumerate(outcomes):
+                if isinstance(error, (BrokenProcessPool, pickle.PicklingError)):
+                    logger.warning(
+                        "Process pool unavailable for sheet '%s' (%s); retrying on a thread",
+                        sheet_names[index], error
                     )
+                    try:
+                        outcomes[index] = (run_in_thread(sheet_names[index]), None)
+                    except Exception as e:
+                        outcomes[index] = (None, e)
+        else:
+            outcomes = run_per_sheet(run_in_thread, sheet_names, progress_callback=progress_callback)
 
-                step2_path = self.step2_processor.populate_template_with_article_info(
-                    template_path, article_name, article_number
-                )
-                step3_path = self.step3_processor.transfer_data(step2_path, source_file, sheet_name)
-                step4_path = self.step4_processor.remove_duplicates(step3_path)
-
+        for sheet_name, (file_entry, error) in zip(sheet_names, outcomes):
+            if error is None:
                 results['success_count'] += 1
-                results['step4_files'].append({
-                    'sheet_name': sheet_name,
-                    'filename': Path(step4_path).name,
-                    'file_path': step4_path
-                })
-
-            except Exception as e:
-                logging.error(f"Pipeline failed for sheet '{sheet_name}': {str(e)}")
+                results['step4_files'].append(file_entry)
+            else:
+                logger.error("Pipeline failed for sheet '%s': %s", sheet_name, error)
                 results['failed_count'] += 1
                 results['failed_sheets'].append(sheet_name)
 
         return results
 
+    def _get_output_path(self, step: str, original_filename: str, sheet_name: str) -> str:
+        """Build the output path for a step file from the configured naming template."""
+        filename_template = self.step4_processor.processing_config["general"]["file_naming"][step]
+        filename = filename_template.format(base_name=Path(original_filename).stem, sheet_name=sheet_name)
+        return str(self.step4_processor.output_dir / filename)
+
     def reload_configuration(self):
         """Reload all configurations."""
         ConfigManager.reload_configs()
+        clear_sheet_cache()
+        close_read_only_workbooks()
         self.template_creator = CoreTemplateCreator(self.output_dir, self.config_dir)
         self.step2_processor = CoreStep2Processor(self.output_dir, self.config_dir)
         self.step3_processor = CoreStep3DataTransfer(self.output_dir, self.config_dir)
@@ -1,17 +1,31 @@
 """Step 1 — Template creator."""
 
+import io
+import json
 import logging
+import os
+import threading
+from functools import lru_cache
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from .config_manager import ConfigManager
+from .workbook_io import COL_LETTERS, ensure_output_dir, load_workbook_bytes, workbook_to_bytes
+
+logger = logging.getLogger(__name__)
 
 
 class CoreTemplateCreator:
     """Core template creator using unified configuration"""
 
+    # Serialized prototypes shared by every instance in the process, keyed by
+    # the configuration that shapes the template
+    _prototype_cache: Dict[str, bytes] = {}
+    _prototype_lock = threading.Lock()
+
     def __init__(self, output_dir: Optional[str] = None, config_dir: Optional[str] = None):
         self.config_dir = config_dir
         self.template_config = ConfigManager.get_template_config(config_dir)
@@ -23,7 +37,37 @@ class CoreTemplateCreator:
             output_dir_name = self.processing_config.get("general", {}).get("output_dir", "output")
             self.output_dir = Path(output_dir_name)
 
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Header styles are invariant across sheets; build them once per instance,
+        # sharing one (Font, PatternFill) pair per distinct colour combination
+        headers = self.get_template_headers()
+        style_cache: Dict[Tuple[str, str], Tuple[Font, PatternFill]] = {}
+        for header_info in headers:
+            style_key = (header_info["font_color"], header_info["bg_color"])
+            if style_key not in style_cache:
+                style_cache[style_key] = (
+                    Font(bold=True, color=header_info["font_color"]),
+                    PatternFill(
+                        start_color=header_info["bg_color"],
+                        end_color=header_info["bg_color"],
+                        fill_type="solid"
+                    ),
+                )
+        self._header_styles = [
+            style_cache[(header_info["font_color"], header_info["bg_color"])]
+            for header_info in headers
+        ]
+        self._header_alignment = self._create_alignment_style(self.template_config["header_alignment"])
+        self._col_letters = COL_LETTERS[:len(headers)]
+
+        # Per-instance memo of file validations; the expected headers come from
+        # this instance's config, so the cache cannot be shared across instances
+        self._validate_file_cached = lru_cache(maxsize=64)(self._validate_file)
+
+        # Serialized template prototype; identical for every sheet, so it is
+        # fetched (or built) once here and worker threads only copy the bytes out
+        self._template_bytes: Optional[bytes] = None
+        self._prototype_valid: Optional[bool] = None
+        self.get_template_bytes()
 
     def _create_font_style(self, font_config: Dict[str, Any]) -> Font:
         """Create openpyxl Font object from configuration"""
@@ -60,60 +104,162 @@ class CoreTemplateCreator:
             output_filename = filename_template.format(base_name=base_name, sheet_name=sheet_name)
             output_path = self.output_dir / output_filename
 
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = self.processing_config["general"]["worksheet_titles"]["step1"]
-
-            template_structure = self.template_config["template_structure"]
-            layout_config = self.template_config["layout"]
-            header_row = layout_config["header_row"]
-
-            # Article info rows (row_1/row_2) are placed dynamically in Step 2
-            headers = template_structure["headers"]
-            header_alignment = self._create_alignment_style(self.template_config["header_alignment"])
-
-            for col_idx, header_info in enumerate(headers, 1):
-                cell = ws.cell(header_row, col_idx, header_info["name"])
-                cell.font = Font(bold=True, color=header_info["font_color"])
-                cell.fill = PatternFill(
-                    start_color=header_info["bg_color"],
-                    end_color=header_info["bg_color"],
-                    fill_type="solid"
-                )
-                cell.alignment = header_alignment
-                col_letter = chr(64 + col_idx)
-                ws.column_dimensions[col_letter].width = header_info["width"]
-
-            wb.save(str(output_path))
-            logging.info(f"Created template: {output_path}")
+            ensure_output_dir(self.output_dir)
+            output_path.write_bytes(self.get_template_bytes())
+            logger.info("Created template: %s", output_path)
             return str(output_path)
 
         except Exception as e:
-            logging.error(f"Error creating template for sheet '{sheet_name}': {str(e)}")
+            logger.error("Error creating template for sheet '%s': %s", sheet_name, e)
             return None
 
+    def create_and_validate(self, sheet_name: str, original_filename: str) -> Tuple[Optional[str], bool]:
+        """
+        Validate the template in memory, then write it only if it is valid.
+
+        Every sheet gets the same prototype bytes, so they are validated once
+        per instance and the written file never has to be re-read.
+        Returns (path or None, is_valid).
+        """
+        if self._prototype_valid is None:
+            self._prototype_valid = self.validate_template_bytes()
+        if not self._prototype_valid:
+            logger.error("Template for sheet '%s' failed validation; not written", sheet_name)
+            return None, False
+        return self.create_template(sheet_name, original_filename), True
+
+    def create_template_bytes(self, sheet_name: str, original_filename: str) -> Tuple[str, bytes]:
+        """Return (Step 1 filename, xlsx bytes) for a sheet without writing to disk."""
+        filename_template = self.processing_config["general"]["file_naming"]["step1"]
+        filename = filename_template.format(base_name=Path(original_filename).stem, sheet_name=sheet_name)
+        return filename, self.get_template_bytes()
+
+    def get_template_bytes(self) -> bytes:
+        """Return the serialized template prototype, built at most once per configuration."""
+        if self._template_bytes is None:
+            key = self._prototype_key()
+            with self._prototype_lock:
+                if key not in self._prototype_cache:
+                    self._prototype_cache[key] = self._build_prototype_bytes()
+                self._template_bytes = self._prototype_cache[key]
+        return self._template_bytes
+
+    def _prototype_key(self) -> str:
+        """Stable key over every config value the prototype depends on."""
+        return json.dumps(
+            [
+                self.get_template_headers(),
+                self.template_config["layout"]["header_row"],
+                self.template_config["header_alignment"],
+                self.processing_config["general"]["worksheet_titles"]["step1"],
+            ],
+            sort_keys=True,
+        )
+
+    def _build_prototype_bytes(self) -> bytes:
+        """
+        Serialize the template using a write-only workbook.
+
+        Write-only mode streams rows straight to the XML writer without
+        keeping cell objects; column widths must be set before any append.
+        """
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(self.processing_config["general"]["worksheet_titles"]["step1"])
+
+        headers = self.get_template_headers()
+        header_row = self.template_config["layout"]["header_row"]
+
+        for col_letter, header_info in zip(self._col_letters, headers):
+            ws.column_dimensions[col_letter].width = header_info["width"]
+
+        # Article info rows (row_1/row_2) are placed dynamically in Step 2
+        for _ in range(header_row - 1):
+            ws.append([])
+
+        header_cells = []
+        for header_info, (font, fill) in zip(headers, self._header_styles):
+            cell = WriteOnlyCell(ws, value=header_info["name"])
+            cell.font = font
+            cell.fill = fill
+            cell.alignment = self._header_alignment
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        return workbook_to_bytes(wb)
+
+    def load_template_workbook(self) -> openpyxl.Workbook:
+        """Open a fresh copy of the cached template from memory."""
+        return load_workbook_bytes(self.get_template_bytes())
+
+    def build_template_workbook(self) -> openpyxl.Workbook:
+        """Build an in-memory Step 1 template workbook (header row only)."""
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = self.processing_config["general"]["worksheet_titles"]["step1"]
+
+        header_row = self.template_config["layout"]["header_row"]
+
+        # Article info rows (row_1/row_2) are placed dynamically in Step 2
+        headers = self.get_template_headers()
+        for col_idx, header_info in enumerate(headers, 1):
+            cell = ws.cell(header_row, col_idx, header_info["name"])
+            cell.font, cell.fill = self._header_styles[col_idx - 1]
+            cell.alignment = self._header_alignment
+            ws.column_dimensions[self._col_letters[col_idx - 1]].width = header_info["width"]
+
+        return wb
+
     def get_template_headers(self) -> List[Dict[str, Any]]:
         """Get template headers from configuration"""
         return self.template_config["template_structure"]["headers"]
 
     def validate_template_structure(self, template_path: str) -> bool:
-        """Validate that a created template has the correct structure."""
+        """
+        Validate that a created template has the correct structure.
+
+        Results are memoized per (path, mtime, size), so re-validating an
+        unchanged file does not reopen it.
+        """
         try:
-            wb = openpyxl.load_workbook(template_path)
-            ws = wb.active
+            stat = os.stat(template_path)
+            return self._validate_file_cached(str(template_path), stat.st_mtime_ns, stat.st_size)
 
-            template_structure = self.template_config["template_structure"]
-            layout_config = self.template_config["layout"]
-            header_row = layout_config["header_row"]
+        except Exception as e:
+            logger.error("Error validating template structure: %s", e)
+            return False
 
-            headers = template_structure["headers"]
-            for col_idx, header_info in enumerate(headers, 1):
-                cell_value = ws.cell(header_row, col_idx).value
-                if cell_value != header_info["name"]:
-                    return False
+    def _validate_file(self, template_path: str, mtime_ns: int, size: int) -> bool:
+        """Uncached file validation; mtime_ns/size only form the cache key."""
+        # Read-only mode streams the sheet XML instead of building every cell
+        wb = openpyxl.load_workbook(template_path, read_only=True, data_only=True, keep_links=False)
+        try:
+            return self._validate_worksheet(wb.active)
+        finally:
+            wb.close()
 
-            return True
+    def validate_template_bytes(self, data: Optional[bytes] = None) -> bool:
+        """Validate a serialized template (the cached prototype by default) without touching disk."""
+        try:
+            wb = openpyxl.load_workbook(
+                io.BytesIO(self.get_template_bytes() if data is None else data),
+                read_only=True, data_only=True, keep_links=False
+            )
+            try:
+                return self._validate_worksheet(wb.active)
+            finally:
+                wb.close()
 
         except Exception as e:
-            logging.error(f"Error validating template structure: {str(e)}")
+            logger.error("Error validating template structure: %s", e)
             return False
+
+    def _validate_worksheet(self, ws) -> bool:
+        """Check the header row of ``ws`` against the configured headers."""
+        header_row = self.template_config["layout"]["header_row"]
+        expected = [header_info["name"] for header_info in self.get_template_headers()]
+
+        for row in ws.iter_rows(
+            min_row=header_row, max_row=header_row, max_col=len(expected), values_only=True
+        ):
+            return list(row) == expected
+        return False
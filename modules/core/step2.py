@@ -2,20 +2,53 @@
 
 import logging
 import re
+from bisect import bisect_right
+from itertools import islice
+import numpy as np
 import openpyxl
 import pandas as pd
-from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
 
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 
 from .config_manager import ConfigManager
+from .workbook_io import (
+    COL_LETTERS,
+    ensure_output_dir,
+    is_openpyxl_readable,
+    iter_sheet_rows,
+    load_workbook_bytes,
+    read_sheet_frame,
+    split_step_filename,
+    workbook_to_bytes,
+)
+
+logger = logging.getLogger(__name__)
+
+# Article name/number labels are only looked for in the first rows of a sheet
+ARTICLE_SCAN_ROWS = 12
+
+# Joins a row's cell texts into one search buffer; never part of a literal pattern
+CELL_SEPARATOR = '\x1f'
+
+# Separators between multiple article names / numbers in one cell, mapped to '\n'
+NAME_SEPARATORS = str.maketrans({';': '\n'})
+NUMBER_SEPARATORS = str.maketrans({';': '\n', ',': '\n'})
+
+# Colons and whitespace between a label and its value ("Article name: X")
+VALUE_PREFIX_RE = re.compile(r'^[\s:]+')
 
 
 class CoreStep2Processor:
     """Core Step 2 processor using unified configuration"""
 
+    # Named styles registered on each Step 2 workbook; cells then reference
+    # them by name instead of carrying their own Font/Fill/Alignment copies
+    ARTICLE_NAME_STYLE = "tss_article_name"
+    ARTICLE_NUMBER_STYLE = "tss_article_number"
+
     def __init__(self, output_dir: Optional[str] = None, config_dir: Optional[str] = None):
         self.config_dir = config_dir
         self.processing_config = ConfigManager.get_processing_config(config_dir)
@@ -25,22 +58,84 @@ class CoreStep2Processor:
         else:
             output_dir_name = self.processing_config.get("general", {}).get("output_dir", "output")
             self.output_dir = Path(output_dir_name)
-
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._filename_template = self.processing_config["general"]["file_naming"]["step2"]
 
         step2_config = self.processing_config["step2_config"]
         self.product_name_patterns = step2_config["product_name_patterns"]
         self.article_number_patterns = step2_config["article_number_patterns"]
+        # One alternation per pattern list lets most cells be rejected with a
+        # single C-level search instead of one substring test per pattern
+        self._name_re = self._compile_patterns(self.product_name_patterns)
+        self._number_re = self._compile_patterns(self.article_number_patterns)
+
+        # Layout and style config are fixed for the instance; resolve them once
+        template_config = ConfigManager.get_template_config(self.config_dir)
+        self._article_layout = template_config["layout"]["article_info_rows"]
+        self._name_start_col = openpyxl.utils.column_index_from_string(
+            self._article_layout["article_name_start_column"]
+        )
+        self._number_start_col = openpyxl.utils.column_index_from_string(
+            self._article_layout["article_number_start_column"]
+        )
+        self._article_name_rotation = (
+            template_config["article_info_style"]["article_name_alignment"]["text_rotation"]
+        )
+        self._article_styles = self._build_article_styles(template_config["article_info_style"])
+
+    @staticmethod
+    def _compile_patterns(patterns: List[str]) -> Optional[re.Pattern]:
+        """Compile literal patterns into a single alternation regex (None if empty)."""
+        if not patterns:
+            return None
+        return re.compile("|".join(re.escape(pattern) for pattern in patterns))
+
+    def _build_article_styles(self, article_style: dict) -> dict:
+        """Build the shared font/fill/alignment bundles for article info cells."""
+        fill = PatternFill(
+            start_color=article_style["fill"]["start_color"][2:],
+            end_color=article_style["fill"]["end_color"][2:],
+            fill_type=article_style["fill"]["fill_type"]
+        )
+        font = Font(
+            bold=article_style["font"]["bold"],
+            color=article_style["font"]["color"][2:]
+        )
+        name_alignment = Alignment(
+            text_rotation=article_style["article_name_alignment"]["text_rotation"],
+            horizontal=article_style["article_name_alignment"]["horizontal"],
+            vertical=article_style["article_name_alignment"]["vertical"],
+            wrap_text=article_style["article_name_alignment"].get("wrap_text", False)
+        )
+        number_alignment = Alignment(
+            horizontal=article_style["alignment"]["horizontal"],
+            vertical=article_style["alignment"]["vertical"]
+        )
+        return {
+            self.ARTICLE_NAME_STYLE: (font, fill, name_alignment),
+            self.ARTICLE_NUMBER_STYLE: (font, fill, number_alignment),
+        }
+
+    def _register_article_style(self, wb, name: str) -> str:
+        """Add the named style to ``wb`` once and return its name."""
+        # A fresh NamedStyle per workbook: add_named_style binds the object to
+        # the workbook, so sharing one across concurrent sheets is unsafe
+        if name not in wb.named_styles:
+            font, fill, alignment = self._article_styles[name]
+            wb.add_named_style(NamedStyle(name=name, font=font, fill=fill, alignment=alignment))
+        return name
 
     def extract_article_info_from_uploaded_file(
         self, uploaded_file: UploadedFile, sheet_name: str
     ) -> Tuple[List[str], List[str]]:
         """Extract article names and numbers from uploaded Streamlit file."""
         try:
-            df = pd.read_excel(uploaded_file, sheet_name=sheet_name, header=None)
+            if is_openpyxl_readable(uploaded_file.name):
+                rows = iter_sheet_rows(uploaded_file, sheet_name, max_row=ARTICLE_SCAN_ROWS)
+                return self._search_article_info_in_rows(rows)
+            df = read_sheet_frame(uploaded_file, sheet_name)
             return self._search_article_info_in_dataframe(df)
         except Exception as e:
-            logging.error(f"Error extracting article info from sheet '{sheet_name}': {str(e)}")
+            logger.error("Error extracting article info from sheet '%s': %s", sheet_name, e)
             return [], []
 
     def extract_article_info_from_file(
@@ -48,85 +143,192 @@ class CoreStep2Processor:
     ) -> Tuple[List[str], List[str]]:
         """Extract article names and numbers from a local file."""
         try:
-            df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+            if is_openpyxl_readable(file_path):
+                rows = iter_sheet_rows(file_path, sheet_name, max_row=ARTICLE_SCAN_ROWS)
+                return self._search_article_info_in_rows(rows)
+            df = read_sheet_frame(file_path, sheet_name)
             return self._search_article_info_in_dataframe(df)
         except Exception as e:
-            logging.error(f"Error extracting article info from sheet '{sheet_name}': {str(e)}")
+            logger.error("Error extracting article info from sheet '%s': %s", sheet_name, e)
+            return [], []
+
+    def extract_article_info_from_dataframe(
+        self, df: pd.DataFrame
+    ) -> Tuple[List[str], List[str]]:
+        """Extract article names and numbers from an already-loaded sheet."""
+        try:
+            return self._search_article_info_in_dataframe(df)
+        except Exception as e:
+            logger.error("Error extracting article info from dataframe: %s", e)
             return [], []
 
     def _search_article_info_in_dataframe(
         self, df: pd.DataFrame
     ) -> Tuple[List[str], List[str]]:
-        """Search for article information in a pandas DataFrame and return arrays."""
+        """
+        Search for article information in a pandas DataFrame and return arrays.
+
+        The first rows are converted to one string array and each pattern is
+        located with a vectorized np.char.find; only the (few) hit cells are
+        then examined in Python, in the same row-major order as the row scan.
+        """
+        block = df.iloc[:ARTICLE_SCAN_ROWS].to_numpy(dtype=object)
+        if block.size == 0:
+            return [], []
+
+        filled = pd.notna(block)
+        text = np.char.strip(np.where(filled, block, '').astype(str))
+
+        article_name = self._first_article_value(block, filled, text, self.product_name_patterns)
+        article_number = self._first_article_value(block, filled, text, self.article_number_patterns)
+        return self._split_article_values(article_name, article_number)
+
+    def _first_article_value(
+        self, block: np.ndarray, filled: np.ndarray, text: np.ndarray, patterns: List[str]
+    ) -> Optional[str]:
+        """First value found for ``patterns`` scanning ``text`` row-major, like the row scan."""
+        if not patterns:
+            return None
+
+        hits = np.zeros(text.shape, dtype=bool)
+        for pattern in patterns:
+            hits |= np.char.find(text, pattern) >= 0
+        hits &= filled
+
+        for row_idx, col_idx in np.argwhere(hits):
+            value = self._match_article_field(str(text[row_idx, col_idx]), block[row_idx], col_idx, patterns)
+            if value is not None:
+                return value
+        return None
+
+    def _search_article_info_in_rows(
+        self, rows: Iterable[Sequence[Any]]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Search the leading rows of a sheet for article information.
+
+        ``rows`` are plain value tuples (openpyxl values_only rows or
+        DataFrame itertuples); blank cells are None or NaN.
+        """
         article_name = None
         article_number = None
+        # A field with no patterns configured can never be found; don't scan for it
+        name_re = self._name_re
+        number_re = self._number_re
 
         # Only search rows 1-12 (0-indexed 0-11)
-        for row_idx, row in df.iterrows():
-            if row_idx > 11:
+        for row in islice(rows, ARTICLE_SCAN_ROWS):
+            # Scalar NaN check without the pd.isna dispatch; blanks are None or float NaN
+            texts = [
+                '' if v is None or (isinstance(v, float) and v != v) else str(v).strip()
+                for v in row
+            ]
+            buffer = CELL_SEPARATOR.join(texts)
+            starts = []
+            offset = 0
+            for text in texts:
+                starts.append(offset)
+                offset += len(text) + 1
+
+            if name_re is not None:
+                article_name = self._find_article_field_in_row(
+                    name_re, buffer, starts, texts, row, self.product_name_patterns
+                )
+                if article_name is not None:
+                    name_re = None
+
+            if number_re is not None:
+                article_number = self._find_article_field_in_row(
+                    number_re, buffer, starts, texts, row, self.article_number_patterns
+                )
+                if article_number is not None:
+                    number_re = None
+
+            if name_re is None and number_re is None:
                 break
 
-            for col_idx, cell_value in enumerate(row):
-                if pd.isna(cell_value):
-                    continue
+        return self._split_article_values(article_name, article_number)
+
+    def _find_article_field_in_row(
+        self,
+        regex: re.Pattern,
+        buffer: str,
+        starts: List[int],
+        texts: List[str],
+        row: Sequence[Any],
+        patterns: List[str],
+    ) -> Optional[str]:
+        """
+        First value for ``patterns`` in one row, searching the joined row buffer.
 
-                cell_str = str(cell_value).strip()
-
-                if article_name is None:
-                    for pattern in self.product_name_patterns:
-                        if pattern in cell_str:
-                            article_name = self._extract_value_after_pattern(cell_str, pattern)
-                            if not article_name and col_idx + 1 < len(row):
-                                next_cell = row.iloc[col_idx + 1]
-                                if not pd.isna(next_cell):
-                                    article_name = str(next_cell).strip()
-                            break
-
-                if article_number is None:
-                    for pattern in self.article_number_patterns:
-                        if pattern in cell_str:
-                            article_number = self._extract_value_after_pattern(cell_str, pattern)
-                            if not article_number and col_idx + 1 < len(row):
-                                next_cell = row.iloc[col_idx + 1]
-                                if not pd.isna(next_cell):
-                                    article_number = str(next_cell).strip()
-                            break
-
-                if article_name and article_number:
-                    break
-
-            if article_name and article_number:
+        One regex search covers the whole row; the hit offset maps back to its
+        cell, so cells without a pattern are never examined. If a hit cell
+        yields no value the search resumes at the next cell, which keeps the
+        left-to-right order of a per-cell scan.
+        """
+        match = regex.search(buffer)
+        while match:
+            col_idx = bisect_right(starts, match.start()) - 1
+            value = self._match_article_field(texts[col_idx], row, col_idx, patterns)
+            if value is not None:
+                return value
+            if col_idx + 1 >= len(starts):
                 break
+            match = regex.search(buffer, starts[col_idx + 1])
+        return None
+
+    def _match_article_field(
+        self, cell_str: str, row: Sequence[Any], col_idx: int, patterns: List[str]
+    ) -> Optional[str]:
+        """
+        Value for the first pattern (in list order) contained in ``cell_str``.
 
+        Text after the pattern wins; otherwise the next cell in the row is
+        used. None means the cell did not yield a value and scanning goes on.
+        """
+        for pattern in patterns:
+            if pattern in cell_str:
+                value = self._extract_value_after_pattern(cell_str, pattern)
+                if not value:
+                    value = self._next_cell_text(row, col_idx)
+                return value
+        return None
+
+    @staticmethod
+    def _split_article_values(
+        article_name: Optional[str], article_number: Optional[str]
+    ) -> Tuple[List[str], List[str]]:
+        """Split raw article name/number text into individual values."""
         article_names = []
         if article_name:
-            names = re.split(r'[\n;]+', article_name.strip())
+            names = article_name.translate(NAME_SEPARATORS).split('\n')
             article_names = [n.strip() for n in names if n.strip()]
 
         article_numbers = []
         if article_number:
-            numbers = re.split(r'[,\n;]+', article_number.strip())
+            numbers = article_number.translate(NUMBER_SEPARATORS).split('\n')
             article_numbers = [n.strip() for n in numbers if n.strip()]
 
         return article_names, article_numbers
 
-    def _extract_value_after_pattern(self, text: str, pattern: str) -> Optional[str]:
-        """Extract value that comes after a pattern in text."""
-        try:
-            pattern_index = text.find(pattern)
-            if pattern_index == -1:
-                return None
-
-            after_pattern = text[pattern_index + len(pattern):].strip()
-
-            while after_pattern and after_pattern[0] in ['::', ':', ' ']:
-                after_pattern = after_pattern[1:].strip()
-
-            return after_pattern if after_pattern else None
+    @staticmethod
+    def _next_cell_text(row: Sequence[Any], col_idx: int) -> Optional[str]:
+        """Value right of ``col_idx`` as stripped text, or None if blank/missing."""
+        if col_idx + 1 < len(row):
+            next_cell = row[col_idx + 1]
+            if next_cell is not None and not pd.isna(next_cell):
+                return str(next_cell).strip()
+        return None
 
-        except Exception:
+    def _extract_value_after_pattern(self, text: str, pattern: str) -> Optional[str]:
+        """Extract value that comes after a pattern in text, minus leading colons/whitespace."""
+        pattern_index = text.find(pattern)
+        if pattern_index == -1:
             return None
 
+        after_pattern = VALUE_PREFIX_RE.sub('', text[pattern_index + len(pattern):], count=1).rstrip()
+        return after_pattern or None
+
     def populate_template_with_article_info(
         self,
         template_path: str,
@@ -143,85 +345,80 @@ class CoreStep2Processor:
             step2_path = self._get_step2_filename(template_path)
 
             wb = openpyxl.load_workbook(template_path)
-            ws = wb.active
-
-            template_config = ConfigManager.get_template_config()
-            layout_config = template_config["layout"]["article_info_rows"]
-            article_style = template_config["article_info_style"]
-
-            if article_names:
-                article_name_row = layout_config["article_name_row"]
-                article_name_merge_end = layout_config["article_name_merge_end"]
-                start_column_letter = layout_config["article_name_start_column"]
-                start_column_index = openpyxl.utils.column_index_from_string(start_column_letter)
-
-                for i, article_name in enumerate(article_names):
-                    current_column_index = start_column_index + i
-                    current_column_letter = openpyxl.utils.get_column_letter(current_column_index)
-
-                    merge_range = f"{current_column_letter}{article_name_row}:{current_column_letter}{article_name_merge_end}"
-                    ws.merge_cells(merge_range)
-
-                    cell = ws.cell(article_name_row, current_column_index, article_name)
-                    logging.info(
-                        f"Placing article name '{article_name}' in "
-                        f"{current_column_letter}{article_name_row} with "
-                        f"rotation {article_style['article_name_alignment']['text_rotation']}°"
-                    )
+            self.populate_worksheet(wb.active, article_names, article_numbers)
 
-                    cell.fill = PatternFill(
-                        start_color=article_style["fill"]["start_color"][2:],
-                        end_color=article_style["fill"]["end_color"][2:],
-                        fill_type=article_style["fill"]["fill_type"]
-                    )
-                    cell.font = Font(
-                        bold=article_style["font"]["bold"],
-                        color=article_style["font"]["color"][2:]
-                    )
-                    cell.alignment = Alignment(
-                        text_rotation=article_style["article_name_alignment"]["text_rotation"],
-                        horizontal=article_style["article_name_alignment"]["horizontal"],
-                        vertical=article_style["article_name_alignment"]["vertical"],
-                        wrap_text=article_style["article_name_alignment"].get("wrap_text", False)
-                    )
+            ensure_output_dir(self.output_dir)
+            wb.save(step2_path)
+            logger.info("Created Step 2 file: %s", step2_path)
+            return step2_path
+
+        except Exception as e:
+            logger.error("Error populating template: %s", e)
+            raise
 
-            if article_numbers:
-                article_number_start_row = layout_config["article_number_start_row"]
-                start_column_letter = layout_config["article_number_start_column"]
-                start_column_index = openpyxl.utils.column_index_from_string(start_column_letter)
+    def populate_template_bytes(
+        self,
+        template_data: bytes,
+        template_filename: str,
+        article_names: List[str],
+        article_numbers: List[str],
+    ) -> Tuple[str, bytes]:
+        """In-memory variant of populate_template_with_article_info; returns (filename, bytes)."""
+        wb = load_workbook_bytes(template_data)
+        self.populate_worksheet(wb.active, article_names, article_numbers)
+        return Path(self._get_step2_filename(template_filename)).name, workbook_to_bytes(wb)
 
-                for i, article_number in enumerate(article_numbers):
-                    current_column_index = start_column_index + i
-                    current_column_letter = openpyxl.utils.get_column_letter(current_column_index)
+    def populate_worksheet(
+        self,
+        ws,
+        article_names: List[str],
+        article_numbers: List[str],
+    ) -> None:
+        """Write article names/numbers into an in-memory template worksheet."""
+        layout_config = self._article_layout
+
+        if article_names:
+            article_name_row = layout_config["article_name_row"]
+            article_name_merge_end = layout_config["article_name_merge_end"]
+            start_column_index = self._name_start_col
+            name_style = self._register_article_style(ws.parent, self.ARTICLE_NAME_STYLE)
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+            for i, article_name in enumerate(article_names):
+                current_column_index = start_column_index + i
+
+                # Numeric bounds: no range string to build here and parse back
+                ws.merge_cells(
+                    start_row=article_name_row, start_column=current_column_index,
+                    end_row=article_name_merge_end, end_column=current_column_index,
+                )
 
-                    cell = ws.cell(article_number_start_row, current_column_index, article_number)
-                    logging.info(
-                        f"Placing article number '{article_number}' in "
-                        f"{current_column_letter}{article_number_start_row}"
+                cell = ws.cell(article_name_row, current_column_index, article_name)
+                cell.style = name_style
+                if debug_enabled:
+                    logger.debug(
+                        "Placing article name '%s' in %s%s with rotation %s°",
+                        article_name, COL_LETTERS[current_column_index - 1], article_name_row,
+                        self._article_name_rotation
                     )
 
-                    cell.fill = PatternFill(
-                        start_color=article_style["fill"]["start_color"][2:],
-                        end_color=article_style["fill"]["end_color"][2:],
-                        fill_type=article_style["fill"]["fill_type"]
-                    )
-                    cell.font = Font(
-                        bold=article_style["font"]["bold"],
-                        color=article_style["font"]["color"][2:]
-                    )
-                    cell.alignment = Alignment(
-                        horizontal=article_style["alignment"]["horizontal"],
-                        vertical=article_style["alignment"]["vertical"]
+        if article_numbers:
+            article_number_start_row = layout_config["article_number_start_row"]
+            start_column_index = self._number_start_col
+            number_style = self._register_article_style(ws.parent, self.ARTICLE_NUMBER_STYLE)
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+            for i, article_number in enumerate(article_numbers):
+                current_column_index = start_column_index + i
+
+                cell = ws.cell(article_number_start_row, current_column_index, article_number)
+                cell.style = number_style
+                if debug_enabled:
+                    logger.debug(
+                        "Placing article number '%s' in %s%s",
+                        article_number, COL_LETTERS[current_column_index - 1], article_number_start_row
                     )
 
-            wb.save(step2_path)
-            logging.info(f"Created Step 2 file: {step2_path}")
-            return step2_path
-
-        except Exception as e:
-            logging.error(f"Error populating template: {str(e)}")
-            raise
-
     def _add_checkbox_markings(
         self,
         worksheet,
@@ -237,12 +434,12 @@ class CoreStep2Processor:
 
             num_article_columns = max(len(article_names), len(article_numbers))
             if num_article_columns == 0:
-                logging.info("No article info found, skipping checkbox markings")
+                logger.info("No article info found, skipping checkbox markings")
                 return
 
-            logging.info(
-                f"Adding X marks to {num_article_columns} article column(s) "
-                f"starting from row {data_start_row}"
+            logger.info(
+                "Adding X marks to %s article column(s) starting from row %s",
+                num_article_columns, data_start_row
             )
 
             markings_added = 0
@@ -259,24 +456,13 @@ class CoreStep2Processor:
                     worksheet.cell(row_num, start_column_index + i, "X")
                     markings_added += 1
 
-            logging.info(f"Added {markings_added} X marks to article columns")
+            logger.info("Added %s X marks to article columns", markings_added)
 
         except Exception as e:
-            logging.error(f"Error adding checkbox markings: {str(e)}")
+            logger.error("Error adding checkbox markings: %s", e)
 
     def _get_step2_filename(self, step1_path: str) -> str:
         """Generate Step 2 filename from Step 1 path."""
-        step1_file = Path(step1_path)
-        base_name = step1_file.stem.replace(" - Step1", "")
-        filename_template = self.processing_config["general"]["file_naming"]["step2"]
-
-        parts = base_name.split(" - ")
-        if len(parts) >= 2:
-            original_base = " - ".join(parts[:-1])
-            sheet_name = parts[-1]
-        else:
-            original_base = base_name
-            sheet_name = "Unknown"
-
-        step2_filename = filename_template.format(base_name=original_base, sheet_name=sheet_name)
+        original_base, sheet_name = split_step_filename(str(step1_path), "Step1")
+        step2_filename = self._filename_template.format(base_name=original_base, sheet_name=sheet_name)
         return str(self.output_dir / step2_filename)
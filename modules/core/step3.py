@@ -1,14 +1,32 @@
 """Step 3 — Data transfer from source sheet to Step 2 template."""
 
 import logging
+import numpy as np
 import openpyxl
 import pandas as pd
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 
 from .config_manager import ConfigManager
+from .workbook_io import (
+    ensure_output_dir,
+    is_openpyxl_readable,
+    iter_sheet_rows,
+    load_workbook_bytes,
+    read_sheet_frame,
+    split_step_filename,
+    workbook_to_bytes,
+)
+
+logger = logging.getLogger(__name__)
+
+# Columns A–N decide whether a data row gets X marks
+CHECKBOX_PROBE_COLUMNS = 14
+
+# Rows converted to a string block per vectorized scan; bounds the temporary array
+SCAN_CHUNK_ROWS = 256
 
 
 class CoreStep3DataTransfer:
@@ -23,21 +41,54 @@ class CoreStep3DataTransfer:
         else:
             output_dir_name = self.processing_config.get("general", {}).get("output_dir", "output")
             self.output_dir = Path(output_dir_name)
-
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._filename_template = self.processing_config["general"]["file_naming"]["step3"]
 
         step3_config = self.processing_config["step3_config"]
         self.header_pattern = step3_config["header_pattern"]
         self.column_mapping = step3_config["column_mapping"]
         self.column_combinations = step3_config.get("column_combinations", {})
 
+        # Column letters resolved once; the transfer loops only index rows
+        self._mapping_indices = self._resolve_column_mapping()
+        self._combination_indices = self._resolve_column_combinations()
+
+    def _resolve_column_mapping(self) -> List[Tuple[int, int, str]]:
+        """(0-based source index, 1-based target index, action for error logs) per mapping."""
+        resolved = []
+        for source_col, target_col in self.column_mapping.items():
+            try:
+                resolved.append((
+                    openpyxl.utils.column_index_from_string(source_col) - 1,
+                    openpyxl.utils.column_index_from_string(target_col),
+                    f"mapping column {source_col} to {target_col}",
+                ))
+            except Exception as e:
+                logger.error("Error mapping column %s to %s: %s", source_col, target_col, e)
+        return resolved
+
+    def _resolve_column_combinations(self) -> List[Tuple[int, List[int], str, str]]:
+        """(1-based target index, 0-based source indexes, separator, action for error logs) per combination."""
+        resolved = []
+        for target_col, config in self.column_combinations.items():
+            try:
+                resolved.append((
+                    openpyxl.utils.column_index_from_string(target_col),
+                    [openpyxl.utils.column_index_from_string(c) - 1 for c in config["source_columns"]],
+                    config["separator"],
+                    f"applying combination {target_col}",
+                ))
+            except Exception as e:
+                logger.error("Error applying combination %s: %s", target_col, e)
+        return resolved
+
     def transfer_data(self, step2_path: str, original_source, sheet_name: str) -> str:
         """
         Transfer data from original Excel sheet to Step 2 template.
 
         Args:
             step2_path: Path to Step 2 file
-            original_source: Either file path (str) or UploadedFile object
+            original_source: Sheet DataFrame (header=None), file path (str)
+                or UploadedFile object
             sheet_name: Name of the sheet to transfer data from
 
         Returns:
@@ -47,37 +98,53 @@ class CoreStep3DataTransfer:
             step3_path = self._get_step3_filename(step2_path)
 
             wb = openpyxl.load_workbook(step2_path)
-            ws = wb.active
-
-            if isinstance(original_source, str):
-                header_row, data_rows = self._find_data_in_file(original_source, sheet_name)
-            else:
-                header_row, data_rows = self._find_data_in_uploaded_file(original_source, sheet_name)
-
-            if header_row is not None and data_rows:
-                self._transfer_mapped_data(ws, data_rows, header_row)
-            else:
-                logging.warning(f"No data found to transfer for sheet '{sheet_name}'")
-
-            self._add_checkbox_markings_step3(ws)
+            self.transfer_to_worksheet(wb.active, original_source, sheet_name)
 
+            ensure_output_dir(self.output_dir)
             wb.save(step3_path)
-            logging.info(f"Created Step 3 file: {step3_path}")
+            logger.info("Created Step 3 file: %s", step3_path)
             return step3_path
 
         except Exception as e:
-            logging.error(f"Error transferring data: {str(e)}")
+            logger.error("Error transferring data: %s", e)
             raise
 
+    def transfer_data_bytes(
+        self, step2_data: bytes, step2_filename: str, original_source, sheet_name: str
+    ) -> Tuple[str, bytes]:
+        """In-memory variant of transfer_data; returns (Step 3 filename, bytes)."""
+        wb = load_workbook_bytes(step2_data)
+        self.transfer_to_worksheet(wb.active, original_source, sheet_name)
+        return Path(self._get_step3_filename(step2_filename)).name, workbook_to_bytes(wb)
+
+    def transfer_to_worksheet(self, ws, original_source, sheet_name: str) -> None:
+        """Transfer source rows into an in-memory Step 2 worksheet and add X marks."""
+        if isinstance(original_source, pd.DataFrame):
+            header_row, data_rows = self._find_data_in_dataframe(original_source)
+        elif isinstance(original_source, str):
+            header_row, data_rows = self._find_data_in_file(original_source, sheet_name)
+        else:
+            header_row, data_rows = self._find_data_in_uploaded_file(original_source, sheet_name)
+
+        written_rows: List[int] = []
+        if header_row is not None and data_rows:
+            written_rows = self._transfer_mapped_data(ws, data_rows, header_row)
+        else:
+            logger.warning("No data found to transfer for sheet '%s'", sheet_name)
+
+        self._add_checkbox_markings_step3(ws, written_rows)
+
     def _find_data_in_file(
         self, file_path: str, sheet_name: str
     ) -> Tuple[Optional[int], List[List]]:
         """Find header row and data rows in local file."""
         try:
-            df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+            if is_openpyxl_readable(file_path):
+                return self._find_data_in_rows(iter_sheet_rows(file_path, sheet_name))
+            df = read_sheet_frame(file_path, sheet_name)
             return self._find_data_in_dataframe(df)
         except Exception as e:
-            logging.error(f"Error reading file data: {str(e)}")
+            logger.error("Error reading file data: %s", e)
             return None, []
 
     def _find_data_in_uploaded_file(
@@ -85,158 +152,206 @@ class CoreStep3DataTransfer:
     ) -> Tuple[Optional[int], List[List]]:
         """Find header row and data rows in uploaded file."""
         try:
-            df = pd.read_excel(uploaded_file, sheet_name=sheet_name, header=None)
+            if is_openpyxl_readable(uploaded_file.name):
+                rows = iter_sheet_rows(uploaded_file, sheet_name)
+                return self._find_data_in_rows(rows)
+            df = read_sheet_frame(uploaded_file, sheet_name)
             return self._find_data_in_dataframe(df)
         except Exception as e:
-            logging.error(f"Error reading uploaded file data: {str(e)}")
+            logger.error("Error reading uploaded file data: %s", e)
             return None, []
 
+    def _find_data_in_rows(
+        self, rows: Iterable[Sequence[Any]]
+    ) -> Tuple[Optional[int], List[List]]:
+        """
+        Find header row and extract data rows from streamed value tuples.
+
+        Single pass over read-only rows: scan for the header pattern, then
+        collect non-blank rows from the data offset on. Blank cells become ''
+        to match the DataFrame path.
+        """
+        header_row = None
+        data_rows = []
+        pattern = self.header_pattern.upper()
+        data_start_offset = self.processing_config.get("step3_config", {}).get("data_start_offset", 3)
+
+        for idx, row in enumerate(rows):
+            if header_row is None:
+                if any(
+                    cell_value is not None and pattern in str(cell_value).strip().upper()
+                    for cell_value in row
+                ):
+                    header_row = idx
+                continue
+
+            if idx >= header_row + data_start_offset:
+                row_data = ['' if cell is None else cell for cell in row]
+                if any(str(cell).strip() for cell in row_data):
+                    data_rows.append(row_data)
+
+        return header_row, data_rows
+
+    def _find_header_row_in_dataframe(self, df: pd.DataFrame) -> Optional[int]:
+        """
+        First row (positional) with a cell containing the header pattern, case-insensitive.
+
+        Rows are converted to a string block and searched with np.char.find a
+        chunk at a time, so a header near the top never converts the whole sheet.
+        """
+        pattern = self.header_pattern.upper()
+        for chunk_start in range(0, len(df), SCAN_CHUNK_ROWS):
+            block = df.iloc[chunk_start:chunk_start + SCAN_CHUNK_ROWS].to_numpy(dtype=object)
+            if block.size == 0:
+                return None
+            text = np.where(pd.notna(block), block, '').astype(str)
+            hits = (np.char.find(np.char.upper(np.char.strip(text)), pattern) >= 0).any(axis=1)
+            if hits.any():
+                return chunk_start + int(np.argmax(hits))
+        return None
+
     def _find_data_in_dataframe(
         self, df: pd.DataFrame
     ) -> Tuple[Optional[int], List[List]]:
         """Find header row and extract data rows from DataFrame."""
-        header_row = None
+        header_row = self._find_header_row_in_dataframe(df)
         data_rows = []
 
-        # Search for header pattern (case-insensitive)
-        for idx, row in df.iterrows():
-            for _, cell_value in enumerate(row):
-                if pd.isna(cell_value):
-                    continue
-                if self.header_pattern.upper() in str(cell_value).strip().upper():
-                    header_row = idx
-                    break
-            if header_row is not None:
-                break
-
         if header_row is not None:
             data_start_offset = self.processing_config.get("step3_config", {}).get("data_start_offset", 3)
             actual_data_start_row = header_row + data_start_offset
 
-            for idx in range(actual_data_start_row, len(df)):
-                row_data = df.iloc[idx].fillna('').tolist()
-                if any(str(cell).strip() for cell in row_data):
-                    data_rows.append(row_data)
+            # Blank cells become '', and rows whose cells are all blank/whitespace are dropped
+            for chunk_start in range(actual_data_start_row, len(df), SCAN_CHUNK_ROWS):
+                block = df.iloc[chunk_start:chunk_start + SCAN_CHUNK_ROWS].to_numpy(dtype=object)
+                values = np.where(pd.notna(block), block, '')
+                non_blank = (np.char.str_len(np.char.strip(values.astype(str))) > 0).any(axis=1)
+                data_rows.extend(values[non_blank].tolist())
 
         return header_row, data_rows
 
-    def _transfer_mapped_data(self, worksheet, data_rows: List[List], header_row: int):
-        """Transfer data using column mapping configuration."""
-        template_config = ConfigManager.get_template_config()
+    def _transfer_mapped_data(self, worksheet, data_rows: List[List], header_row: int) -> List[int]:
+        """
+        Transfer data using column mapping configuration, then column combinations.
+
+        Mapped values and combinations like L+M → I (with separator) are built
+        in one pass over the source rows, and each output row is then written
+        by _write_row. A combination targeting a mapped column overrides the
+        mapped value.
+
+        Returns the sorted worksheet rows that received a value in columns A–N,
+        which are exactly the rows that get X marks.
+        """
+        template_config = ConfigManager.get_template_config(self.config_dir)
         start_row = template_config["layout"]["data_start_row"]
 
         if not data_rows:
-            return
+            return []
 
-        for row_idx, row_data in enumerate(data_rows, start_row):
-            for source_col, target_col in self.column_mapping.items():
-                try:
-                    source_idx = openpyxl.utils.column_index_from_string(source_col) - 1  # 0-based
-                    target_idx = openpyxl.utils.column_index_from_string(target_col)       # 1-based
-
-                    if source_idx < len(row_data):
-                        source_value = row_data[source_idx]
-                        if source_value and str(source_value).strip():
-                            worksheet.cell(row_idx, target_idx, source_value)
-                except Exception as e:
-                    logging.error(f"Error mapping column {source_col} to {target_col}: {str(e)}")
-                    continue
-
-        self._apply_column_combinations(worksheet, data_rows, start_row)
-
-    def _apply_column_combinations(
-        self, worksheet, data_rows: List[List], start_row: int
-    ):
-        """Apply column combinations like L+M → I with separator."""
-        if not self.column_combinations:
-            return
+        written_rows = set()
 
         for row_idx, row_data in enumerate(data_rows, start_row):
-            for target_col, config in self.column_combinations.items():
-                try:
-                    source_cols = config["source_columns"]
-                    separator = config["separator"]
-
-                    values = []
-                    for source_col in source_cols:
-                        source_idx = openpyxl.utils.column_index_from_string(source_col) - 1
-                        if source_idx < len(row_data):
-                            value = row_data[source_idx]
-                            if value and str(value).strip():
-                                values.append(str(value).strip())
-
-                    if len(values) == len(source_cols):
-                        combined_value = separator.join(values)
-                        target_idx = ord(target_col) - ord('A') + 1
-                        worksheet.cell(row_idx, target_idx, combined_value)
-
-                except Exception as e:
-                    logging.error(f"Error applying combination {target_col}: {str(e)}")
-                    continue
-
-    def _add_checkbox_markings_step3(self, worksheet):
+            row_len = len(row_data)
+            row_values = {}
+            for source_idx, target_idx, action in self._mapping_indices:
+                if source_idx < row_len:
+                    source_value = row_data[source_idx]
+                    if source_value and str(source_value).strip():
+                        row_values[target_idx] = (source_value, action)
+
+            for target_idx, source_indices, separator, action in self._combination_indices:
+                values = []
+                for source_idx in source_indices:
+                    if source_idx < row_len:
+                        value = row_data[source_idx]
+                        if value and str(value).strip():
+                            values.append(str(value).strip())
+                if len(values) == len(source_indices):
+                    row_values[target_idx] = (separator.join(values), action)
+
+            written_columns = self._write_row(worksheet, row_idx, row_values)
+            if any(target_idx <= CHECKBOX_PROBE_COLUMNS for target_idx in written_columns):
+                written_rows.add(row_idx)
+
+        return sorted(written_rows)
+
+    @staticmethod
+    def _write_row(worksheet, row_idx: int, row_values: Dict[int, Tuple[Any, str]]) -> List[int]:
+        """
+        Write one output row's {column: (value, action)} at row_idx, left to right.
+
+        Cells are addressed explicitly rather than appended, since append()
+        lands after whichever row the worksheet last touched. A failing cell
+        is logged with its action and skipped; the written columns are returned.
+        """
+        written_columns = []
+        for target_idx in sorted(row_values):
+            value, action = row_values[target_idx]
+            try:
+                worksheet.cell(row_idx, target_idx, value)
+                written_columns.append(target_idx)
+            except Exception as e:
+                logger.error("Error %s: %s", action, e)
+        return written_columns
+
+    def _add_checkbox_markings_step3(self, worksheet, data_rows: Optional[Iterable[int]] = None):
         """
         Add X marks in data rows for article columns in Step 3.
 
         Auto-detects article columns by checking which columns (R, S, T, …)
-        have content in rows 1-10.
+        have content in rows 1-10. ``data_rows`` are the rows the transfer
+        just wrote; when omitted, rows are found by probing columns A–N.
         """
         try:
-            template_config = ConfigManager.get_template_config()
+            template_config = ConfigManager.get_template_config(self.config_dir)
             layout_config = template_config["layout"]
             data_start_row = layout_config.get("data_start_row", 11)
             start_column_letter = layout_config["article_info_rows"]["article_name_start_column"]
             start_column_index = openpyxl.utils.column_index_from_string(start_column_letter)
 
-            article_columns = []
-            for col_offset in range(10):
-                current_column_index = start_column_index + col_offset
-                has_article_info = any(
-                    worksheet.cell(row_num, current_column_index).value and
-                    str(worksheet.cell(row_num, current_column_index).value).strip()
-                    for row_num in range(1, 11)
-                )
-                if has_article_info:
-                    article_columns.append(current_column_index)
+            # One block read of rows 1-10 × the 10 candidate columns, then per column
+            article_block = worksheet.iter_rows(
+                min_row=1, max_row=10,
+                min_col=start_column_index, max_col=start_column_index + 9,
+                values_only=True,
+            )
+            article_columns = [
+                start_column_index + col_offset
+                for col_offset, column_values in enumerate(zip(*article_block))
+                if any(value and str(value).strip() for value in column_values)
+            ]
 
             if not article_columns:
-                logging.info("No article columns detected, skipping checkbox markings")
+                logger.info("No article columns detected, skipping checkbox markings")
                 return
 
-            logging.info(f"Detected {len(article_columns)} article column(s) for X markings")
+            logger.info("Detected %s article column(s) for X markings", len(article_columns))
 
-            markings_added = 0
-            for row_num in range(data_start_row, worksheet.max_row + 1):
-                row_has_data = any(
-                    worksheet.cell(row_num, col).value and
-                    str(worksheet.cell(row_num, col).value).strip()
-                    for col in range(1, 15)
-                )
-                if not row_has_data:
-                    continue
+            if data_rows is None:
+                data_rows = [
+                    row_num
+                    for row_num, row_values in enumerate(
+                        worksheet.iter_rows(
+                            min_row=data_start_row, max_col=CHECKBOX_PROBE_COLUMNS, values_only=True
+                        ),
+                        data_start_row,
+                    )
+                    if any(value and str(value).strip() for value in row_values)
+                ]
 
+            markings_added = 0
+            for row_num in data_rows:
                 for column_index in article_columns:
                     worksheet.cell(row_num, column_index, "X")
                     markings_added += 1
 
-            logging.info(f"Added {markings_added} X marks to {len(article_columns)} article column(s)")
+            logger.info("Added %s X marks to %s article column(s)", markings_added, len(article_columns))
 
         except Exception as e:
-            logging.error(f"Error adding checkbox markings in Step 3: {str(e)}")
+            logger.error("Error adding checkbox markings in Step 3: %s", e)
 
     def _get_step3_filename(self, step2_path: str) -> str:
         """Generate Step 3 filename from Step 2 path."""
-        step2_file = Path(step2_path)
-        base_name = step2_file.stem.replace(" - Step2", "")
-        filename_template = self.processing_config["general"]["file_naming"]["step3"]
-
-        parts = base_name.split(" - ")
-        if len(parts) >= 2:
-            original_base = " - ".join(parts[:-1])
-            sheet_name = parts[-1]
-        else:
-            original_base = base_name
-            sheet_name = "Unknown"
-
-        step3_filename = filename_template.format(base_name=original_base, sheet_name=sheet_name)
+        original_base, sheet_name = split_step_filename(str(step2_path), "Step2")
+        step3_filename = self._filename_template.format(base_name=original_base, sheet_name=sheet_name)
         return str(self.output_dir / step3_filename)
@@ -2,11 +2,22 @@
 
 import logging
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border
+from copy import copy
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.worksheet.cell_range import CellRange, MultiCellRange
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 from .config_manager import ConfigManager
+from .workbook_io import (
+    ensure_output_dir,
+    load_workbook_bytes,
+    split_step_filename,
+    workbook_to_bytes,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class CoreStep4DuplicateRemover:
@@ -21,14 +32,19 @@ class CoreStep4DuplicateRemover:
         else:
             output_dir_name = self.processing_config.get("general", {}).get("output_dir", "output")
             self.output_dir = Path(output_dir_name)
-
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._filename_template = self.processing_config["general"]["file_naming"]["step4"]
 
         step4_config = self.processing_config["step4_config"]
         self.comparison_columns = step4_config["comparison_columns"]
         self.max_columns = step4_config["max_columns"]
         self.template_config = ConfigManager.get_template_config(config_dir)
 
+        # Column A replacements keyed by lowercase search term; the first term wins on clashes
+        self._column_a_replacements: Dict[str, Any] = {}
+        transformations = step4_config.get("transformations", {})
+        for search_term, replacement in transformations.get("column_a_replacements", {}).items():
+            self._column_a_replacements.setdefault(search_term.lower(), replacement)
+
     def remove_duplicates(self, step3_path: str) -> str:
         """
         Remove duplicate rows from Step 3 file based on configured columns.
@@ -38,247 +54,246 @@ class CoreStep4DuplicateRemover:
         try:
             step4_path = self._get_step4_filename(step3_path)
 
-            wb = openpyxl.load_workbook(step3_path)
-            ws = wb.active
+            # The Step 3 workbook is only referenced for the build, so it is freed before the save
+            new_wb = self.build_deduplicated_workbook(openpyxl.load_workbook(step3_path).active)
+            ensure_output_dir(self.output_dir)
+            new_wb.save(step4_path)
 
-            # Apply transformations before deduplication
-            layout_config = self.template_config["layout"]
-            self._apply_data_transformations(ws, layout_config)
-
-            unique_rows = self._extract_unique_rows(ws)
-            self._create_deduplicated_file(ws, unique_rows, step4_path)
-
-            logging.info(f"Created Step 4 file: {step4_path}")
+            logger.info("Created Step 4 file: %s", step4_path)
             return step4_path
 
         except Exception as e:
-            logging.error(f"Error removing duplicates: {str(e)}")
+            logger.error("Error removing duplicates: %s", e)
             raise
 
-    def _extract_unique_rows(self, worksheet) -> List[Tuple[int, List]]:
-        """Extract unique rows based on comparison columns, preserving cell objects for formatting."""
-        seen_combinations = set()
-        unique_rows = []
+    def remove_duplicates_bytes(self, step3_data: bytes, step3_filename: str) -> Tuple[str, bytes]:
+        """In-memory variant of remove_duplicates; returns (Step 4 filename, bytes)."""
+        new_wb = self.build_deduplicated_workbook(load_workbook_bytes(step3_data).active)
+        return Path(self._get_step4_filename(step3_filename)).name, workbook_to_bytes(new_wb)
 
-        template_config = ConfigManager.get_template_config()
-        data_start_row = template_config["layout"]["data_start_row"]
-        max_col = min(worksheet.max_column, self.max_columns)
+    def build_deduplicated_workbook(self, ws) -> openpyxl.Workbook:
+        """Transform and deduplicate an in-memory Step 3 worksheet into a new workbook."""
+        # Apply transformations before deduplication
+        layout_config = self.template_config["layout"]
+        self._apply_data_transformations(ws, layout_config)
 
-        for row_num in range(data_start_row, worksheet.max_row + 1):
-            comparison_data = []
-            full_row_cells = []
+        unique_rows = self._extract_unique_rows(ws)
+        return self._create_deduplicated_workbook(ws, unique_rows)
 
-            for col in range(1, max_col + 1):
-                cell = worksheet.cell(row_num, col)
-                cell_str = str(cell.value).strip() if cell.value is not None else ""
+    def _extract_unique_rows(self, worksheet) -> List[int]:
+        """
+        Row numbers of the first occurrence of each comparison key, in sheet order.
+
+        Only values are read here; the writer fetches cells (for their
+        formatting) for the surviving rows alone.
+        """
+        seen_combinations = set()
+        unique_rows = []
 
-                if col in self.comparison_columns:
-                    comparison_data.append(cell_str)
+        template_config = ConfigManager.get_template_config(self.config_dir)
+        data_start_row = template_config["layout"]["data_start_row"]
+        max_col = self._data_column_count(worksheet)
 
-                full_row_cells.append(cell)
+        # 0-based positions of the comparison columns, in column order
+        comparison_positions = [col - 1 for col in sorted(set(self.comparison_columns)) if 1 <= col <= max_col]
 
-            comparison_key = tuple(comparison_data)
+        for row_num, values in enumerate(
+            worksheet.iter_rows(min_row=data_start_row, max_col=max_col, values_only=True), data_start_row
+        ):
+            comparison_key = tuple(
+                '' if values[pos] is None else str(values[pos]).strip()
+                for pos in comparison_positions
+            )
             if comparison_key not in seen_combinations:
                 seen_combinations.add(comparison_key)
-                unique_rows.append((row_num, full_row_cells))
+                unique_rows.append(row_num)
 
         return unique_rows
 
-    def _create_deduplicated_file(
+    def _data_column_count(self, worksheet) -> int:
+        """Number of leading columns that are compared and copied for data rows."""
+        return min(worksheet.max_column, self.max_columns)
+
+    def _create_deduplicated_workbook(
         self,
         source_worksheet,
-        unique_rows: List[Tuple[int, List]],
-        output_path: str,
-    ):
-        """Create new file with deduplicated data."""
+        unique_rows: List[int],
+    ) -> openpyxl.Workbook:
+        """
+        Create new workbook with deduplicated data.
+
+        The Step 4 workbook is only ever saved, so it is built in write-only
+        mode: each row is appended once as styled WriteOnlyCells instead of
+        creating cells one ws.cell() call at a time. Column widths must be
+        set before the first append; merged ranges are written on save.
+        """
         try:
-            new_wb = openpyxl.Workbook()
-            new_ws = new_wb.active
-            new_ws.title = self.processing_config["general"]["worksheet_titles"]["step4"]
+            new_wb = openpyxl.Workbook(write_only=True)
+            new_ws = new_wb.create_sheet(self.processing_config["general"]["worksheet_titles"]["step4"])
 
-            template_config = ConfigManager.get_template_config()
+            template_config = ConfigManager.get_template_config(self.config_dir)
             layout_config = template_config["layout"]
             header_row = layout_config["header_row"]
+            data_start_row = layout_config["data_start_row"]
             article_column = openpyxl.utils.column_index_from_string(
                 layout_config["article_info_rows"]["article_name_start_column"]
             )
+            max_column = source_worksheet.max_column
+            # New-workbook style ids per distinct source style, shared by header and data rows
+            style_cache: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+            # Only columns with an explicit width need copying; walk those directly
+            new_dimensions = new_ws.column_dimensions
+            for col_letter, source_dimension in source_worksheet.column_dimensions.items():
+                if source_dimension.width:
+                    new_dimensions[col_letter].width = source_dimension.width
+
+            # Copy all merged cell ranges in one go: the source ranges are already
+            # distinct, so skip the per-add overlap check and the coord round-trip
+            new_ws.merged_cells = MultiCellRange([
+                CellRange(
+                    min_col=merge_range.min_col, min_row=merge_range.min_row,
+                    max_col=merge_range.max_col, max_row=merge_range.max_row,
+                )
+                for merge_range in source_worksheet.merged_cells.ranges
+            ])
+            logger.info("Copied %s merged cell ranges to Step 4", len(new_ws.merged_cells.ranges))
 
-            # Copy all merged cell ranges first
-            merge_ranges_copied = 0
-            for merge_range in source_worksheet.merged_cells:
-                try:
-                    new_ws.merge_cells(str(merge_range))
-                    merge_ranges_copied += 1
-                except Exception as e:
-                    logging.warning(f"Could not copy merge range {merge_range}: {e}")
-
-            logging.info(f"Copied {merge_ranges_copied} merged cell ranges to Step 4")
-
-            # Copy header rows with formatting
+            # Copy header rows with formatting; merged (non-anchor) cells carry no value
             for row in range(1, header_row + 1):
-                for col in range(1, source_worksheet.max_column + 1):
+                row_cells = []
+                for col in range(1, max_column + 1):
                     source_cell = source_worksheet.cell(row, col)
-                    new_cell = new_ws.cell(row, col)
-
-                    try:
-                        new_cell.value = source_cell.value
-                    except AttributeError:
-                        pass  # MergedCell — skip
-
-                    if source_cell.font:
-                        new_cell.font = Font(
-                            bold=source_cell.font.bold,
-                            color=source_cell.font.color,
-                            italic=source_cell.font.italic,
-                            underline=source_cell.font.underline
-                        )
-                    if source_cell.fill:
-                        new_cell.fill = PatternFill(
-                            start_color=source_cell.fill.start_color,
-                            end_color=source_cell.fill.end_color,
-                            fill_type=source_cell.fill.fill_type
-                        )
-                    if source_cell.alignment:
-                        if col == article_column and source_cell.alignment.text_rotation:
-                            logging.info(
-                                f"Copying rotation {source_cell.alignment.text_rotation}° "
-                                f"to cell R{row}"
-                            )
-                        new_cell.alignment = Alignment(
-                            horizontal=source_cell.alignment.horizontal,
-                            vertical=source_cell.alignment.vertical,
-                            wrap_text=source_cell.alignment.wrap_text,
-                            text_rotation=source_cell.alignment.text_rotation
-                        )
-                    if source_cell.border:
-                        new_cell.border = Border(
-                            left=source_cell.border.left,
-                            right=source_cell.border.right,
-                            top=source_cell.border.top,
-                            bottom=source_cell.border.bottom
+                    new_cell = WriteOnlyCell(new_ws, value=source_cell.value)
+                    if (
+                        col == article_column and source_cell.alignment
+                        and source_cell.alignment.text_rotation
+                    ):
+                        logger.debug(
+                            "Copying rotation %s° to cell R%s",
+                            source_cell.alignment.text_rotation, row
                         )
-
-                    if row == 1:
-                        col_letter = chr(64 + col)
-                        if col_letter in source_worksheet.column_dimensions:
-                            new_ws.column_dimensions[col_letter].width = (
-                                source_worksheet.column_dimensions[col_letter].width
-                            )
-
-            data_start_row = layout_config["data_start_row"]
-
-            # Write unique data rows with formatting
-            for new_row_idx, (_, row_cells) in enumerate(unique_rows, data_start_row):
-                for col_idx, source_cell in enumerate(row_cells, 1):
+                    self._copy_cell_style(source_cell, new_cell, style_cache)
+                    row_cells.append(new_cell)
+                new_ws.append(row_cells)
+
+            for _ in range(header_row + 1, data_start_row):
+                new_ws.append([])
+
+            # Write unique data rows with formatting; empty cells stay unwritten
+            data_columns = range(1, self._data_column_count(source_worksheet) + 1)
+            for source_row in unique_rows:
+                row_cells = []
+                for col in data_columns:
+                    source_cell = source_worksheet.cell(source_row, col)
                     if source_cell.value:
-                        new_cell = new_ws.cell(new_row_idx, col_idx, source_cell.value)
-
-                        if source_cell.font:
-                            new_cell.font = Font(
-                                bold=source_cell.font.bold,
-                                color=source_cell.font.color,
-                                italic=source_cell.font.italic,
-                                underline=source_cell.font.underline
-                            )
-                        if source_cell.fill:
-                            new_cell.fill = PatternFill(
-                                start_color=source_cell.fill.start_color,
-                                end_color=source_cell.fill.end_color,
-                                fill_type=source_cell.fill.fill_type
-                            )
-                        if source_cell.alignment:
-                            new_cell.alignment = Alignment(
-                                horizontal=source_cell.alignment.horizontal,
-                                vertical=source_cell.alignment.vertical,
-                                wrap_text=source_cell.alignment.wrap_text,
-                                text_rotation=source_cell.alignment.text_rotation
-                            )
-                        if source_cell.border:
-                            new_cell.border = Border(
-                                left=source_cell.border.left,
-                                right=source_cell.border.right,
-                                top=source_cell.border.top,
-                                bottom=source_cell.border.bottom
-                            )
-
-            new_wb.save(output_path)
+                        new_cell = WriteOnlyCell(new_ws, value=source_cell.value)
+                        self._copy_cell_style(source_cell, new_cell, style_cache)
+                        row_cells.append(new_cell)
+                    else:
+                        row_cells.append(None)
+                new_ws.append(row_cells)
+
+            return new_wb
 
         except Exception as e:
-            logging.error(f"Error creating deduplicated file: {str(e)}")
+            logger.error("Error creating deduplicated workbook: %s", e)
             raise
 
+    @staticmethod
+    def _copy_cell_style(source_cell, new_cell, style_cache: Dict[Tuple[int, ...], Tuple[int, ...]]) -> None:
+        """
+        Copy font, fill, alignment and border from a Step 3 cell to a Step 4 cell.
+
+        The new-workbook ids of those four styles are cached per distinct
+        source style, so later cells with that style only set the ids. The
+        number format is left alone: WriteOnlyCell derives it from the value.
+        """
+        if not source_cell.has_style:
+            return
+        source_style = source_cell._style
+        key = (source_style.fontId, source_style.fillId, source_style.alignmentId, source_style.borderId)
+        target_ids = style_cache.get(key)
+        if target_ids is None:
+            new_cell.font = copy(source_cell.font)
+            new_cell.fill = copy(source_cell.fill)
+            new_cell.alignment = copy(source_cell.alignment)
+            new_cell.border = copy(source_cell.border)
+            target_style = new_cell._style
+            style_cache[key] = (
+                target_style.fontId, target_style.fillId, target_style.alignmentId, target_style.borderId
+            )
+        else:
+            if new_cell._style is None:
+                new_cell._style = StyleArray()
+            target_style = new_cell._style
+            (
+                target_style.fontId, target_style.fillId, target_style.alignmentId, target_style.borderId
+            ) = target_ids
+
     def _apply_data_transformations(self, worksheet, layout_config: dict):
         """Apply data transformations to the worksheet (Step 4 sub-step)."""
         try:
-            logging.info("Starting data transformations (Step 4 sub-step)")
+            logger.info("Starting data transformations (Step 4 sub-step)")
 
             transformations = self.processing_config.get("step4_config", {}).get("transformations", {})
             if not transformations:
-                logging.info("No transformations configured, skipping")
+                logger.info("No transformations configured, skipping")
                 return
 
             data_start_row = layout_config["data_start_row"]
-            column_a_replacements = transformations.get("column_a_replacements", {})
-            column_h_k_logic = transformations.get("column_h_k_logic", {})
+            column_a_replacements = self._column_a_replacements
+            sd_empty_k = transformations.get("column_h_k_logic", {}).get("sd_empty_k", False)
             transformation_count = 0
 
-            for row_num in range(data_start_row, worksheet.max_row + 1):
+            # Columns A–N decide whether a row has data; H and K are read for the SD rule
+            probe_columns = min(14, worksheet.max_column)
+            scan_columns = max(probe_columns, 11) if sd_empty_k else max(probe_columns, 1)
+
+            for row_num, row_cells in enumerate(
+                worksheet.iter_rows(min_row=data_start_row, max_col=scan_columns), data_start_row
+            ):
                 row_has_data = any(
-                    worksheet.cell(row_num, col).value and
-                    str(worksheet.cell(row_num, col).value).strip()
-                    for col in range(1, min(15, worksheet.max_column + 1))
+                    cell.value and str(cell.value).strip() for cell in row_cells[:probe_columns]
                 )
                 if not row_has_data:
                     continue
 
-                # Column A text replacements
-                col_a_cell = worksheet.cell(row_num, 1)
+                # Column A text replacements (case-insensitive, first configured term wins)
+                col_a_cell = row_cells[0]
                 if col_a_cell.value and str(col_a_cell.value).strip():
                     original_value = str(col_a_cell.value).strip()
-                    lower_value = original_value.lower()
-                    for search_term, replacement in column_a_replacements.items():
-                        if search_term.lower() == lower_value:
-                            logging.info(f"Row {row_num} Col A: '{original_value}' → '{replacement}'")
-                            col_a_cell.value = replacement
-                            transformation_count += 1
-                            break
+                    replacement = column_a_replacements.get(original_value.lower())
+                    if replacement is not None:
+                        logger.debug("Row %s Col A: '%s' → '%s'", row_num, original_value, replacement)
+                        col_a_cell.value = replacement
+                        transformation_count += 1
 
                 # Column H = "SD" → empty Column K
-                if column_h_k_logic.get("sd_empty_k", False):
-                    col_h_cell = worksheet.cell(row_num, 8)
-                    col_k_cell = worksheet.cell(row_num, 11)
+                if sd_empty_k:
+                    col_h_cell = row_cells[7]
+                    col_k_cell = row_cells[10]
                     if (
                         col_h_cell.value and
                         str(col_h_cell.value).strip().upper() == "SD" and
                         col_k_cell.value and
                         str(col_k_cell.value).strip()
                     ):
-                        logging.info(
-                            f"Row {row_num} Col H=SD: Emptying Col K "
-                            f"(was: '{col_k_cell.value}')"
+                        logger.debug(
+                            "Row %s Col H=SD: Emptying Col K (was: '%s')",
+                            row_num, col_k_cell.value
                         )
                         col_k_cell.value = ""
                         transformation_count += 1
 
-            logging.info(f"Data transformations completed: {transformation_count} changes applied")
+            logger.info("Data transformations completed: %s changes applied", transformation_count)
 
         except Exception as e:
-            logging.error(f"Error applying data transformations: {str(e)}")
+            logger.error("Error applying data transformations: %s", e)
             raise
 
     def _get_step4_filename(self, step3_path: str) -> str:
         """Generate Step 4 filename from Step 3 path."""
-        step3_file = Path(step3_path)
-        base_name = step3_file.stem.replace(" - Step3", "")
-        filename_template = self.processing_config["general"]["file_naming"]["step4"]
-
-        parts = base_name.split(" - ")
-        if len(parts) >= 2:
-            original_base = " - ".join(parts[:-1])
-            sheet_name = parts[-1]
-        else:
-            original_base = base_name
-            sheet_name = "Unknown"
-
-        step4_filename = filename_template.format(base_name=original_base, sheet_name=sheet_name)
+        original_base, sheet_name = split_step_filename(str(step3_path), "Step3")
+        step4_filename = self._filename_template.format(base_name=original_base, sheet_name=sheet_name)
         return str(self.output_dir / step4_filename)
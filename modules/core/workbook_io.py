@@ -0,0 +1,204 @@
+"""Workbook I/O helpers — move openpyxl workbooks to and from bytes, prepare output dirs, name step files."""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Hashable, Iterator, Optional, Set, Tuple, Union
+
+import openpyxl
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+# Letters for every Excel column; column index i (1-based) is COL_LETTERS[i - 1]
+MAX_EXCEL_COLUMNS = 16384
+COL_LETTERS: Tuple[str, ...] = tuple(get_column_letter(i) for i in range(1, MAX_EXCEL_COLUMNS + 1))
+
+# Formats openpyxl can open; legacy .xls still goes through pandas/xlrd
+OPENPYXL_SUFFIXES = ('.xlsx', '.xlsm')
+
+# Parsed sheets kept for the Step 2 → Step 3 re-read of the same source
+SHEET_CACHE_SIZE = 16
+_sheet_cache: "OrderedDict[Tuple[Hashable, str], pd.DataFrame]" = OrderedDict()
+_sheet_cache_lock = threading.Lock()
+
+# Read-only workbooks kept open for repeat reads of the same source
+WORKBOOK_CACHE_SIZE = 4
+_workbook_cache: "OrderedDict[Hashable, openpyxl.Workbook]" = OrderedDict()
+_workbook_cache_lock = threading.Lock()
+
+# Output directories already created in this process
+_ready_dirs: Set[Path] = set()
+_ready_dirs_lock = threading.Lock()
+
+
+def workbook_to_bytes(wb: openpyxl.Workbook) -> bytes:
+    """Serialize a workbook to xlsx bytes without touching disk."""
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def load_workbook_bytes(data: bytes) -> openpyxl.Workbook:
+    """Open an xlsx held in memory for editing."""
+    return openpyxl.load_workbook(io.BytesIO(data))
+
+
+def is_openpyxl_readable(filename: str) -> bool:
+    """True if the file can be streamed with openpyxl's read-only reader."""
+    return str(filename).lower().endswith(OPENPYXL_SUFFIXES)
+
+
+def open_read_only_workbook(source):
+    """
+    Return a read-only workbook for ``source``, parsed once per source.
+
+    Opening an xlsx decodes the zip directory, workbook XML and shared
+    strings; Step 2 and Step 3 (and every sheet of the same upload) reuse
+    that work and only parse the sheet XML they iterate. Uploads are opened
+    from their bytes so the shared Streamlit stream position is never used.
+    Sources without a cache key get a fresh workbook the caller must close.
+    """
+    return _read_only_workbook(source)[0]
+
+
+def _read_only_workbook(source) -> Tuple[openpyxl.Workbook, bool]:
+    """(workbook, cached) for ``source``; see open_read_only_workbook."""
+    key = source_key(source)
+    if key is None:
+        return openpyxl.load_workbook(source, read_only=True, data_only=True, keep_links=False), False
+
+    with _workbook_cache_lock:
+        wb = _workbook_cache.get(key)
+        if wb is not None:
+            _workbook_cache.move_to_end(key)
+            return wb, True
+
+    data = source if isinstance(source, (str, Path)) else io.BytesIO(source.getvalue())
+    wb = openpyxl.load_workbook(data, read_only=True, data_only=True, keep_links=False)
+
+    with _workbook_cache_lock:
+        _workbook_cache[key] = wb
+        _workbook_cache.move_to_end(key)
+        # Evicted workbooks are not closed here: another thread may still
+        # be iterating one; it closes when the last reference goes away
+        while len(_workbook_cache) > WORKBOOK_CACHE_SIZE:
+            _workbook_cache.popitem(last=False)
+    return wb, True
+
+
+def close_read_only_workbooks() -> None:
+    """Close and forget every cached read-only workbook."""
+    with _workbook_cache_lock:
+        workbooks = list(_workbook_cache.values())
+        _workbook_cache.clear()
+    for wb in workbooks:
+        wb.close()
+
+
+def iter_sheet_rows(source, sheet_name: str, max_row: Optional[int] = None) -> Iterator[Tuple]:
+    """
+    Stream a sheet's cell values row by row from a read-only workbook.
+
+    ``source`` is a path or an upload. Only the rows actually consumed are
+    parsed; the workbook itself comes from open_read_only_workbook, so
+    reading another sheet, or the same sheet again, skips the workbook parse.
+    """
+    wb, cached = _read_only_workbook(source)
+    try:
+        yield from wb[sheet_name].iter_rows(max_row=max_row, values_only=True)
+    finally:
+        if not cached:
+            wb.close()
+
+
+def source_key(source) -> Optional[Hashable]:
+    """
+    Stable cache key for a source workbook, or None if it cannot be cached.
+
+    Paths key on (path, mtime, size) so an edited file is re-read; uploads key
+    on their Streamlit file id (name and size as a fallback). Object ids are
+    never used since they are recycled once the upload is garbage collected,
+    so anonymous streams such as a bare BytesIO are not cached.
+    """
+    if isinstance(source, (str, Path)):
+        stat = os.stat(source)
+        return ('path', os.path.abspath(source), stat.st_mtime_ns, stat.st_size)
+    file_id = getattr(source, 'file_id', None)
+    if file_id is not None:
+        return ('upload', file_id)
+    name = getattr(source, 'name', None)
+    size = getattr(source, 'size', None)
+    if name is None or size is None:
+        return None
+    return ('upload', name, size)
+
+
+def read_sheet_frame(source, sheet_name: str) -> pd.DataFrame:
+    """
+    Parse one sheet with header=None, reusing an earlier parse of the same source.
+
+    Step 2 and Step 3 each read the sheet they work on; the second read is a
+    cache hit. Callers must not modify the returned DataFrame.
+    """
+    base_key = source_key(source)
+    key = (base_key, sheet_name)
+    if base_key is not None:
+        with _sheet_cache_lock:
+            df = _sheet_cache.get(key)
+            if df is not None:
+                _sheet_cache.move_to_end(key)
+                return df
+
+    # An upload is shared across sheet workers; read its bytes instead of seeking the stream
+    data = source if isinstance(source, (str, Path)) else io.BytesIO(source.getvalue())
+    df = pd.read_excel(data, sheet_name=sheet_name, header=None)
+    if base_key is None:
+        return df
+
+    with _sheet_cache_lock:
+        _sheet_cache[key] = df
+        _sheet_cache.move_to_end(key)
+        while len(_sheet_cache) > SHEET_CACHE_SIZE:
+            _sheet_cache.popitem(last=False)
+    return df
+
+
+def clear_sheet_cache() -> None:
+    """Drop every cached sheet, e.g. after the configuration is reloaded."""
+    with _sheet_cache_lock:
+        _sheet_cache.clear()
+
+
+def ensure_output_dir(directory: Union[str, Path]) -> Path:
+    """
+    Create an output directory on first write, then remember it.
+
+    Steps only need their output directory when saving to disk; in-memory
+    runs never create it, and repeat saves skip the mkdir syscall.
+    """
+    directory = Path(directory)
+    if directory not in _ready_dirs:
+        with _ready_dirs_lock:
+            if directory not in _ready_dirs:
+                directory.mkdir(parents=True, exist_ok=True)
+                _ready_dirs.add(directory)
+    return directory
+
+
+@lru_cache(maxsize=64)
+def split_step_filename(path: str, step_label: str) -> Tuple[str, str]:
+    """
+    (original base name, sheet name) from a step file named "<base> - <sheet> - <step_label>".
+
+    Names without a " - " separator yield (base, "Unknown"). Every sheet of
+    a source shares its base, so repeated lookups are cache hits.
+    """
+    base_name = Path(path).stem.replace(f" - {step_label}", "")
+    parts = base_name.split(" - ")
+    if len(parts) >= 2:
+        return " - ".join(parts[:-1]), parts[-1]
+    return base_name, "Unknown"
+
@@ -6,11 +6,22 @@ Handles file export and download functionality for the TSS Converter web applica
 import io
 import zipfile
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union, BinaryIO
 import tempfile
 import os
+import time
 import logging
 
+# Members that are already zip/deflate containers gain nothing from a second pass
+PRECOMPRESSED_EXTENSIONS = {'.xlsx', '.xlsm', '.zip'}
+
+
+def get_zip_compression(filename: str) -> int:
+    """Store pre-compressed members as-is and deflate everything else (csv, txt, ...)"""
+    if Path(filename).suffix.lower() in PRECOMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
 class FileExporter:
     """Handles file export and download operations"""
     
@@ -18,44 +29,57 @@ class FileExporter:
         """Initialize the file exporter"""
         self.temp_files = []
     
-    def create_zip_download(self, file_list: List[Dict[str, Any]]) -> bytes:
+    def write_zip(self, file_list: List[Dict[str, Any]], output: Union[str, BinaryIO]) -> None:
         """
-        Create a ZIP file containing multiple template files for download
+        Write a ZIP archive of the given files directly to a path or file object
+        
+        Members are streamed from disk by ZipFile.write, so the archive is never
+        held in memory as a whole. Excel members are stored uncompressed: .xlsx
+        files are already deflated internally and a second deflate pass gains
+        almost nothing. Any other member type is deflated.
         
         Args:
             file_list: List of dictionaries containing file information
-                      Each dict should have: 'filename', 'file_path', 'sheet_name'
-                      
-        Returns:
-            Bytes object containing the ZIP file data
+                      Each dict should have: 'filename', 'sheet_name' and either
+                      'file_path' or in-memory 'data' bytes
+            output: Destination path or writable binary file object
         """
         try:
-            # Create a BytesIO buffer to hold the ZIP file
-            zip_buffer = io.BytesIO()
-            
-            # Create ZIP file
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED, allowZip64=True) as zip_file:
                 for file_info in file_list:
-                    file_path = file_info['file_path']
+                    file_path = file_info.get('file_path')
                     filename = file_info['filename']
+                    compress_type = get_zip_compression(filename)
                     
-                    # Add file to ZIP
-                    if os.path.exists(file_path):
-                        zip_file.write(file_path, filename)
+                    # In-memory outputs are written straight from their buffer
+                    if file_info.get('data') is not None:
+                        zip_file.writestr(filename, file_info['data'], compress_type=compress_type)
+                    elif file_path and os.path.exists(file_path):
+                        zip_file.write(file_path, filename, compress_type=compress_type)
                     else:
                         logging.warning(f"File not found for ZIP: {file_path}")
             
-            # Get the ZIP file bytes
-            zip_buffer.seek(0)
-            zip_bytes = zip_buffer.getvalue()
-            zip_buffer.close()
-            
-            return zip_bytes
-            
         except Exception as e:
             logging.error(f"Error creating ZIP file: {str(e)}")
             raise Exception(f"Failed to create ZIP download: {str(e)}")
     
+    def create_zip_download(self, file_list: List[Dict[str, Any]]) -> bytes:
+        """
+        Create a ZIP file containing multiple template files for download
+        
+        Prefer write_zip() when the archive is going to disk anyway.
+        
+        Args:
+            file_list: List of dictionaries containing file information
+                      Each dict should have: 'filename', 'file_path', 'sheet_name'
+                      
+        Returns:
+            Bytes object containing the ZIP file data
+        """
+        zip_buffer = io.BytesIO()
+        self.write_zip(file_list, zip_buffer)
+        return zip_buffer.getvalue()
+    
     def prepare_single_file_download(self, file_path: str) -> bytes:
         """
         Prepare a single file for download
@@ -200,6 +224,43 @@ class FileExporter:
                 'files_detail': []
             }
     
+    def cleanup_old_files(self, directory: Union[str, Path], max_age_hours: float = 24,
+                          extensions: tuple = ('.zip', '.xlsx')) -> int:
+        """
+        Delete generated files older than ``max_age_hours`` from a directory
+        
+        Uses os.scandir so the mtime comes from the directory scan's cached
+        entry metadata instead of a separate Path/stat round trip per file.
+        
+        Args:
+            directory: Directory holding generated outputs
+            max_age_hours: Files last modified before this age are removed
+            extensions: Only files with these suffixes are considered
+            
+        Returns:
+            Number of files removed
+        """
+        cutoff = time.time() - max_age_hours * 3600
+        removed = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.name.lower().endswith(extensions):
+                        continue
+                    try:
+                        if entry.is_file(follow_symlinks=False) and \
+                                entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                            os.unlink(entry.path)
+                            removed += 1
+                    except OSError as e:
+                        logging.warning(f"Could not remove old file {entry.path}: {str(e)}")
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logging.warning(f"Error cleaning up old files in {directory}: {str(e)}")
+        
+        return removed
+    
     def cleanup_temp_files(self):
         """Clean up any temporary files created during processing"""
         try:
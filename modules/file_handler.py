@@ -9,8 +9,27 @@ from pathlib import Path
 from typing import Dict, List, Any, Tuple, Optional
 import tempfile
 import io
+import logging
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+
+def get_excel_engine(filename: str) -> str:
+    """
+    Pick the fastest available pandas engine for an Excel file
+    
+    Calamine (Rust-backed, pandas>=2.2) parses both .xlsx and .xls natively
+    and is used whenever it is installed; otherwise fall back to openpyxl/xlrd.
+    """
+    if CALAMINE_AVAILABLE:
+        return 'calamine'
+    return 'openpyxl' if filename.lower().endswith('.xlsx') else 'xlrd'
+
 class ExcelFileHandler:
     """Handles Excel file operations for the web application"""
     
@@ -54,37 +73,71 @@ class ExcelFileHandler:
         except Exception as e:
             raise Exception(f"Error reading file information: {str(e)}")
     
-    def read_excel_sheets(self, uploaded_file: UploadedFile) -> Dict[str, pd.DataFrame]:
+    def read_excel_sheets(self, uploaded_file: UploadedFile, header: Optional[int] = 0) -> Dict[str, pd.DataFrame]:
         """
-        Read all sheets from an Excel file
+        Read all sheets from an Excel file in a single pass
+        
+        The workbook is opened once and every sheet is parsed from the same
+        handle, so the resulting DataFrames can be passed through the whole
+        pipeline instead of re-reading the upload in each step.
         
         Args:
             uploaded_file: Streamlit uploaded file object
+            header: Row to use as column labels (None keeps the raw cell grid)
             
         Returns:
             Dictionary mapping sheet names to DataFrames
         """
         try:
-            # Create a temporary file to work with
-            with tempfile.NamedTemporaryFile(delete=False, suffix=Path(uploaded_file.name).suffix) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_file.flush()
-                
-                # Read all sheets using pandas
-                sheets_dict = pd.read_excel(
-                    tmp_file.name,
-                    sheet_name=None,  # Read all sheets
-                    engine='openpyxl' if uploaded_file.name.endswith('.xlsx') else 'xlrd'
-                )
-                
-                # Clean up temporary file
-                Path(tmp_file.name).unlink()
-                
-                return sheets_dict
+            data = uploaded_file.getvalue()
+            engine = get_excel_engine(uploaded_file.name)
+            parse_kwargs = {'header': header}
+            
+            try:
+                return self._parse_all_sheets(data, engine, parse_kwargs)
+            except Exception as e:
+                if engine != 'calamine':
+                    raise
+                # Calamine is stricter about some malformed workbooks that the
+                # pure-Python readers tolerate; retry once with those
+                fallback = 'openpyxl' if uploaded_file.name.lower().endswith('.xlsx') else 'xlrd'
+                logging.warning("Calamine failed to read %s (%s); retrying with %s",
+                                uploaded_file.name, e, fallback)
+                return self._parse_all_sheets(data, fallback, parse_kwargs)
                 
         except Exception as e:
             raise Exception(f"Error reading Excel sheets: {str(e)}")
     
+    def _parse_all_sheets(self, data: bytes, engine: str,
+                          parse_kwargs: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+        """Parse every sheet of an in-memory workbook with one engine"""
+        with pd.ExcelFile(io.BytesIO(data), engine=engine) as excel_file:
+            return {
+                sheet_name: (
+                    excel_file.parse(sheet_name, **parse_kwargs)
+                    if self._sheet_may_have_data(excel_file, sheet_name)
+                    else pd.DataFrame()
+                )
+                for sheet_name in excel_file.sheet_names
+            }
+    
+    def _sheet_may_have_data(self, excel_file: pd.ExcelFile, sheet_name: str) -> bool:
+        """
+        Cheap pre-parse emptiness check from sheet dimensions
+        
+        Calamine reports each sheet's used range without materializing rows,
+        so blank sheets can be skipped. Other engines have no reliable
+        equivalent (openpyxl reports "A1" for both blank and one-cell sheets)
+        and are always parsed.
+        """
+        if excel_file.engine != 'calamine':
+            return True
+        
+        try:
+            return excel_file.book.get_sheet_by_name(sheet_name).height > 0
+        except Exception:
+            return True
+    
     def get_sheet_preview(self, uploaded_file: UploadedFile, sheet_name: str, max_rows: int = 10) -> pd.DataFrame:
         """
         Get a preview of a specific sheet
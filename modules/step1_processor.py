@@ -1,10 +1,39 @@
 """Step 1 processor — Streamlit wrapper around CoreTemplateCreator."""
 
 import logging
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
-from .core import CoreTemplateCreator
+from .core import CoreTemplateCreator, iter_per_sheet, run_per_sheet
+from .exporter import FileExporter
+
+# Excel's own sheet-title rules; names breaking them also make unsafe output filenames
+INVALID_SHEET_NAME_CHARS = frozenset('[]:*?/\\')
+MAX_SHEET_NAME_LENGTH = 31
+
+
+@dataclass
+class MultiTemplateResult:
+    """Aggregate outcome of create_multiple_templates; also readable as results['key']."""
+
+    success_count: int = 0
+    failed_count: int = 0
+    created_files: List[Dict[str, Any]] = field(default_factory=list)
+    failed_sheets: List[str] = field(default_factory=list)
+    failure_reasons: Dict[str, str] = field(default_factory=dict)
+    total_sheets: int = 0
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
 
 
 class TemplateConverter:
@@ -15,59 +44,259 @@ class TemplateConverter:
 
     def __init__(self, output_dir: Optional[str] = None):
         self.core_creator = CoreTemplateCreator(output_dir)
+        self._template_info: Optional[Dict[str, Any]] = None
+        # (sheet_name, original_filename) -> created template path
+        self._created_templates: Dict[Tuple[str, str], Path] = {}
+        # Template creation runs on worker threads; the lock keeps counters consistent
+        self._stats_lock = threading.Lock()
+        self._stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        """Fresh counters for template creation statistics."""
+        return {
+            'created': 0,
+            'cache_hits': 0,
+            'failures': 0,
+            'total_seconds': 0.0,
+            'per_sheet_seconds': {},
+            'last_run': None,
+        }
 
     def create_template_for_sheet(
         self, sheet_name: str, original_filename: str
-    ) -> Optional[str]:
-        """Create a Step 1 template for a specific sheet."""
-        return self.core_creator.create_template(sheet_name, original_filename)
+    ) -> Optional[Path]:
+        """
+        Create a Step 1 template for a specific sheet.
+
+        The template does not depend on the sheet's contents, so a file created
+        earlier for the same sheet and source name is reused while it exists.
+        """
+        key = (sheet_name, original_filename)
+        template_path = self._created_templates.get(key)
+        if template_path and template_path.exists():
+            with self._stats_lock:
+                self._stats['cache_hits'] += 1
+            return template_path
+
+        start = time.perf_counter()
+        created_path = self.core_creator.create_template(sheet_name, original_filename)
+        elapsed = time.perf_counter() - start
+        template_path = Path(created_path) if created_path else None
+
+        if template_path:
+            self._created_templates[key] = template_path
+        with self._stats_lock:
+            self._stats['created' if template_path else 'failures'] += 1
+            self._stats['total_seconds'] += elapsed
+            self._stats['per_sheet_seconds'][sheet_name] = elapsed
+            self._stats['last_run'] = time.time()
+        return template_path
+
+    def create_and_validate(
+        self, sheet_name: str, original_filename: str
+    ) -> Tuple[Optional[Path], bool]:
+        """Create a template after validating it in memory; returns (path or None, is_valid)."""
+        template_path, is_valid = self.core_creator.create_and_validate(sheet_name, original_filename)
+        return (Path(template_path) if template_path else None), is_valid
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return a snapshot of template creation counters and timings."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats['per_sheet_seconds'] = dict(self._stats['per_sheet_seconds'])
+        return stats
+
+    def reset_stats(self) -> None:
+        """Zero all template creation counters and timings."""
+        with self._stats_lock:
+            self._stats = self._empty_stats()
+
+    def clear_template_cache(self) -> None:
+        """Forget previously created templates so the next call rewrites them."""
+        self._created_templates.clear()
+
+    def create_multiple_templates_parallel(
+        self,
+        sheet_names: list,
+        original_filename: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        max_workers: Optional[int] = None,
+    ) -> List[Optional[Path]]:
+        """Create templates on a thread pool; returns paths (None on failure) in input order."""
+        outcomes = run_per_sheet(
+            lambda sheet_name: self.create_template_for_sheet(sheet_name, original_filename),
+            sheet_names,
+            max_workers=max_workers,
+            progress_callback=progress_callback,
+        )
+        return [template_path for template_path, _ in outcomes]
+
+    def iter_create_multiple_templates(
+        self,
+        sheet_names: list,
+        original_filename: str,
+        in_memory: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Create templates concurrently, yielding one result per sheet as it finishes.
+
+        Each result has 'index', 'sheet_name', 'ok', 'filename', 'error' and
+        either 'file_path' or, with in_memory=True, the xlsx bytes under 'data'.
+        Results arrive in completion order; 'index' is the position in sheet_names.
+        """
+        if in_memory:
+            func = lambda sheet_name: self.core_creator.create_template_bytes(sheet_name, original_filename)
+        else:
+            func = lambda sheet_name: self.create_template_for_sheet(sheet_name, original_filename)
+
+        base_stem = Path(original_filename).stem
+        for index, created, error in iter_per_sheet(func, sheet_names, max_workers=max_workers):
+            sheet_name = sheet_names[index]
+            result: Dict[str, Any] = {'index': index, 'sheet_name': sheet_name, 'error': error}
+
+            if in_memory and error is None:
+                result['filename'], result['data'] = created
+            else:
+                result['filename'] = f"{base_stem} - {sheet_name} - Step1.xlsx"
+                result['file_path'] = created
+
+            result['ok'] = error is None and created is not None
+            if error is not None:
+                logging.error(f"Error creating template for sheet '{sheet_name}': {str(error)}")
+            yield result
 
     def create_multiple_templates(
-        self, sheet_names: list, original_filename: str
-    ) -> Dict[str, Any]:
-        """Create templates for multiple sheets."""
-        results: Dict[str, Any] = {
-            'success_count': 0,
-            'failed_count': 0,
-            'created_files': [],
-            'failed_sheets': [],
-            'total_sheets': len(sheet_names)
-        }
+        self,
+        sheet_names: list,
+        original_filename: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        in_memory: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> MultiTemplateResult:
+        """
+        Create templates for multiple sheets concurrently, keeping input order.
+
+        With in_memory=True each created entry carries the xlsx under 'data'
+        instead of a 'file_path', and nothing is written to disk.
+        """
+        results = MultiTemplateResult(total_sheets=len(sheet_names))
+
+        # Reject unusable names before any template work is done for them
+        rejected: Dict[int, str] = {}
+        seen = set()
+        for index, sheet_name in enumerate(sheet_names):
+            reason = self._check_sheet_name(sheet_name, seen)
+            if reason:
+                suggestion = self._sanitize_sheet_name(sheet_name)
+                if suggestion != sheet_name and suggestion not in seen:
+                    reason = f"{reason} — try '{suggestion}'"
+                rejected[index] = reason
+            else:
+                seen.add(sheet_name)
+        accepted = [name for index, name in enumerate(sheet_names) if index not in rejected]
 
-        for sheet_name in sheet_names:
-            template_path = self.create_template_for_sheet(sheet_name, original_filename)
+        ordered: List[Optional[Dict[str, Any]]] = [None] * len(accepted)
+        for done, result in enumerate(
+            self.iter_create_multiple_templates(
+                accepted, original_filename, in_memory=in_memory, max_workers=max_workers
+            ),
+            start=1,
+        ):
+            ordered[result['index']] = result
+            if progress_callback:
+                progress_callback(done, len(accepted))
 
-            if template_path:
-                results['success_count'] += 1
-                results['created_files'].append({
-                    'sheet_name': sheet_name,
-                    'filename': f"{Path(original_filename).stem} - {sheet_name} - Step1.xlsx",
-                    'file_path': template_path
-                })
+        created = iter(ordered)
+        for index, sheet_name in enumerate(sheet_names):
+            if index in rejected:
+                logging.warning(f"Skipping sheet '{sheet_name}': {rejected[index]}")
+                results.failed_count += 1
+                results.failed_sheets.append(sheet_name)
+                results.failure_reasons[sheet_name] = rejected[index]
+                continue
+
+            result = next(created)
+            if result['ok']:
+                results.success_count += 1
+                entry = {'sheet_name': result['sheet_name'], 'filename': result['filename']}
+                if in_memory:
+                    entry['data'] = result['data']
+                else:
+                    entry['file_path'] = result['file_path']
+                results.created_files.append(entry)
             else:
-                results['failed_count'] += 1
-                results['failed_sheets'].append(sheet_name)
+                results.failed_count += 1
+                results.failed_sheets.append(result['sheet_name'])
+                results.failure_reasons[sheet_name] = str(result['error'] or "Template creation failed")
 
         return results
 
-    def validate_template_structure(self, template_path: str) -> bool:
+    @staticmethod
+    def _check_sheet_name(sheet_name: str, seen: set) -> Optional[str]:
+        """Return why a sheet name cannot be used, or None if it is fine."""
+        if not sheet_name or not str(sheet_name).strip():
+            return "empty sheet name"
+        if len(sheet_name) > MAX_SHEET_NAME_LENGTH:
+            return f"longer than {MAX_SHEET_NAME_LENGTH} characters"
+        if INVALID_SHEET_NAME_CHARS & set(sheet_name):
+            return "contains one of " + " ".join(sorted(INVALID_SHEET_NAME_CHARS))
+        if sheet_name in seen:
+            return "duplicate sheet name"
+        return None
+
+    @staticmethod
+    def _sanitize_sheet_name(sheet_name: str) -> str:
+        """Suggest a usable version of a sheet name, e.g. "Q1/2024" -> "Q1-2024"."""
+        cleaned = "".join("-" if ch in INVALID_SHEET_NAME_CHARS else ch for ch in str(sheet_name))
+        return cleaned.strip()[:MAX_SHEET_NAME_LENGTH] or "Sheet"
+
+    def create_bundle(
+        self,
+        sheet_names: list,
+        original_filename: str,
+        max_workers: Optional[int] = None,
+    ) -> bytes:
+        """
+        Build the templates for all sheets in memory and return them as one ZIP.
+
+        Nothing is written to the output directory; the archive bytes can be
+        passed straight to st.download_button.
+        """
+        results = self.create_multiple_templates(
+            sheet_names, original_filename, in_memory=True, max_workers=max_workers
+        )
+        return FileExporter().create_zip_download(results.created_files)
+
+    def validate_template_structure(self, template_path: Union[str, Path]) -> bool:
         """Validate that a created template has the correct structure."""
         return self.core_creator.validate_template_structure(template_path)
 
-    def get_output_directory(self) -> str:
+    def get_output_directory(self) -> Path:
         """Get the output directory path."""
+        return self.core_creator.output_dir
+
+    def get_output_directory_str(self) -> str:
+        """Get the output directory path as a string (pre-Path API)."""
         return str(self.core_creator.output_dir)
 
     def get_template_info(self) -> Dict[str, Any]:
-        """Get information about the template structure."""
-        headers = self.core_creator.get_template_headers()
-        return {
-            'header_count': len(headers),
-            'columns': [h["name"] for h in headers],
-            'structure': {
-                'row_1': "Article name",
-                'row_2': "Article number",
-                'row_3': "Headers (A-Q)"
-            },
-            'output_format': "[base_name] - [sheet_name] - Step1.xlsx"
-        }
+        """Get information about the template structure (built once per instance)."""
+        if self._template_info is None:
+            headers = self.core_creator.get_template_headers()
+            self._template_info = {
+                'header_count': len(headers),
+                'columns': tuple(h["name"] for h in headers),
+                'structure': {
+                    'row_1': "Article name",
+                    'row_2': "Article number",
+                    'row_3': "Headers (A-Q)"
+                },
+                'output_format': "[base_name] - [sheet_name] - Step1.xlsx"
+            }
+        return self._template_info
+
+    def invalidate_template_info(self) -> None:
+        """Drop the cached template info, e.g. after the template config is reloaded."""
+        self._template_info = None
@@ -4,10 +4,10 @@ Wrapper around core pipeline for Step 2 processing.
 """
 
 import logging
+import pandas as pd
 from pathlib import Path
-from typing import Optional, Dict, Any
-from streamlit.runtime.uploaded_file_manager import UploadedFile
-from .core import CoreStep2Processor
+from typing import Optional, Dict, Any, Callable
+from .core import CoreStep2Processor, run_per_sheet
 
 class Step2Processor:
     """
@@ -25,13 +25,53 @@ class Step2Processor:
         # Initialize core processor
         self.core_processor = CoreStep2Processor(output_dir)
     
-    def process_multiple_sheets_to_step2(self, uploaded_file: UploadedFile, step1_files: list) -> Dict[str, Any]:
+    def process_single_sheet(self, df: pd.DataFrame, step1_file: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process one sheet from Step 1 to Step 2
+        
+        Args:
+            df: Source sheet DataFrame (header=None)
+            step1_file: Step 1 entry with 'sheet_name', 'filename' and 'file_path' or 'data'
+            
+        Returns:
+            Step 2 entry in the same form (in-memory 'data' if the input had it)
+        """
+        sheet_name = step1_file['sheet_name']
+        
+        # Extract article information
+        article_name, article_number = self.core_processor.extract_article_info_from_dataframe(df)
+        
+        # Populate template with extracted information
+        if step1_file.get('data') is not None:
+            filename, data = self.core_processor.populate_template_bytes(
+                step1_file['data'], step1_file['filename'], article_name, article_number
+            )
+            return {'sheet_name': sheet_name, 'filename': filename, 'data': data}
+        
+        step2_path = self.core_processor.populate_template_with_article_info(
+            step1_file['file_path'], article_name, article_number
+        )
+        
+        return {
+            'sheet_name': sheet_name,
+            'filename': Path(step2_path).name,
+            'file_path': step2_path
+        }
+    
+    def process_multiple_sheets_to_step2(self, sheets_data: Dict[str, pd.DataFrame], step1_files: list,
+                                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                                         max_workers: Optional[int] = None) -> Dict[str, Any]:
         """
         Process multiple sheets from Step 1 to Step 2
         
+        Sheets are processed concurrently; results keep the input order.
+        
         Args:
-            uploaded_file: Original uploaded file for data extraction
-            step1_files: List of Step 1 files to process
+            sheets_data: Sheet DataFrames (header=None) parsed once from the upload
+            step1_files: List of Step 1 files to process; entries carrying in-memory
+                'data' produce in-memory Step 2 entries, others are read from 'file_path'
+            progress_callback: Optional callback(done, total) invoked as sheets finish
+            max_workers: Thread count override (default: up to 8, bounded by CPUs and sheets)
             
         Returns:
             Dictionary with results and Step 2 file paths
@@ -44,30 +84,20 @@ class Step2Processor:
             'total_sheets': len(step1_files)
         }
         
-        for step1_file in step1_files:
-            try:
-                sheet_name = step1_file['sheet_name']
-                template_path = step1_file['file_path']
-                
-                # Extract article information
-                article_name, article_number = self.core_processor.extract_article_info_from_uploaded_file(
-                    uploaded_file, sheet_name
-                )
-                
-                # Populate template with extracted information
-                step2_path = self.core_processor.populate_template_with_article_info(
-                    template_path, article_name, article_number
-                )
-                
+        outcomes = run_per_sheet(
+            lambda step1_file: self.process_single_sheet(sheets_data[step1_file['sheet_name']], step1_file),
+            step1_files,
+            max_workers=max_workers,
+            progress_callback=progress_callback
+        )
+        
+        for step1_file, (step2_file, error) in zip(step1_files, outcomes):
+            if error is None:
                 results['success_count'] += 1
-                results['step2_files'].append({
-                    'sheet_name': sheet_name,
-                    'filename': Path(step2_path).name,
-                    'file_path': step2_path
-                })
-                
-            except Exception as e:
-                logging.error(f"Error processing Step 2 for sheet '{sheet_name}': {str(e)}")
+                results['step2_files'].append(step2_file)
+            else:
+                sheet_name = step1_file['sheet_name']
+                logging.error(f"Error processing Step 2 for sheet '{sheet_name}': {str(error)}")
                 results['failed_count'] += 1
                 results['failed_sheets'].append(sheet_name)
         
@@ -4,10 +4,10 @@ Wrapper around core pipeline for Step 3 data transfer.
 """
 
 import logging
+import pandas as pd
 from pathlib import Path
-from typing import Optional, Dict, Any
-from streamlit.runtime.uploaded_file_manager import UploadedFile
-from .core import CoreStep3DataTransfer
+from typing import Optional, Dict, Any, Callable
+from .core import CoreStep3DataTransfer, run_per_sheet
 
 class Step3DataTransfer:
     """
@@ -25,13 +25,48 @@ class Step3DataTransfer:
         # Initialize core processor
         self.core_processor = CoreStep3DataTransfer(output_dir)
     
-    def process_multiple_sheets_to_step3(self, uploaded_file: UploadedFile, step2_files: list) -> Dict[str, Any]:
+    def process_single_sheet(self, df: pd.DataFrame, step2_file: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process one sheet from Step 2 to Step 3
+        
+        Args:
+            df: Source sheet DataFrame (header=None)
+            step2_file: Step 2 entry with 'sheet_name', 'filename' and 'file_path' or 'data'
+            
+        Returns:
+            Step 3 entry in the same form (in-memory 'data' if the input had it)
+        """
+        sheet_name = step2_file['sheet_name']
+        
+        # Transfer data from the already-parsed sheet to Step 2 template
+        if step2_file.get('data') is not None:
+            filename, data = self.core_processor.transfer_data_bytes(
+                step2_file['data'], step2_file['filename'], df, sheet_name
+            )
+            return {'sheet_name': sheet_name, 'filename': filename, 'data': data}
+        
+        step3_path = self.core_processor.transfer_data(step2_file['file_path'], df, sheet_name)
+        
+        return {
+            'sheet_name': sheet_name,
+            'filename': Path(step3_path).name,
+            'file_path': step3_path
+        }
+    
+    def process_multiple_sheets_to_step3(self, sheets_data: Dict[str, pd.DataFrame], step2_files: list,
+                                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                                         max_workers: Optional[int] = None) -> Dict[str, Any]:
         """
         Process multiple sheets from Step 2 to Step 3
         
+        Sheets are processed concurrently; results keep the input order.
+        
         Args:
-            uploaded_file: Original uploaded file for data extraction
-            step2_files: List of Step 2 files to process
+            sheets_data: Sheet DataFrames (header=None) parsed once from the upload
+            step2_files: List of Step 2 files to process; entries carrying in-memory
+                'data' produce in-memory Step 3 entries, others are read from 'file_path'
+            progress_callback: Optional callback(done, total) invoked as sheets finish
+            max_workers: Thread count override (default: up to 8, bounded by CPUs and sheets)
             
         Returns:
             Dictionary with results and Step 3 file paths
@@ -44,25 +79,20 @@ class Step3DataTransfer:
             'total_sheets': len(step2_files)
         }
         
-        for step2_file in step2_files:
-            try:
-                sheet_name = step2_file['sheet_name']
-                step2_path = step2_file['file_path']
-                
-                # Transfer data from original file to Step 2 template
-                step3_path = self.core_processor.transfer_data(
-                    step2_path, uploaded_file, sheet_name
-                )
-                
+        outcomes = run_per_sheet(
+            lambda step2_file: self.process_single_sheet(sheets_data[step2_file['sheet_name']], step2_file),
+            step2_files,
+            max_workers=max_workers,
+            progress_callback=progress_callback
+        )
+        
+        for step2_file, (step3_file, error) in zip(step2_files, outcomes):
+            if error is None:
                 results['success_count'] += 1
-                results['step3_files'].append({
-                    'sheet_name': sheet_name,
-                    'filename': Path(step3_path).name,
-                    'file_path': step3_path
-                })
-                
-            except Exception as e:
-                logging.error(f"Error processing Step 3 for sheet '{sheet_name}': {str(e)}")
+                results['step3_files'].append(step3_file)
+            else:
+                sheet_name = step2_file['sheet_name']
+                logging.error(f"Error processing Step 3 for sheet '{sheet_name}': {str(error)}")
                 results['failed_count'] += 1
                 results['failed_sheets'].append(sheet_name)
         
@@ -5,8 +5,8 @@ Wrapper around core pipeline for Step 4 duplicate removal.
 
 import logging
 from pathlib import Path
-from typing import Optional, Dict, Any
-from .core import CoreStep4DuplicateRemover
+from typing import Optional, Dict, Any, Callable
+from .core import CoreStep4DuplicateRemover, run_per_sheet
 
 class Step4DuplicateRemover:
     """
@@ -24,12 +24,44 @@ class Step4DuplicateRemover:
         # Initialize core processor
         self.core_processor = CoreStep4DuplicateRemover(output_dir)
     
-    def process_multiple_sheets_to_step4(self, step3_files: list) -> Dict[str, Any]:
+    def process_single_sheet(self, step3_file: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process one sheet from Step 3 to Step 4
+        
+        Args:
+            step3_file: Step 3 entry with 'sheet_name', 'filename' and 'file_path' or 'data'
+            
+        Returns:
+            Step 4 entry in the same form (in-memory 'data' if the input had it)
+        """
+        # Remove duplicates from Step 3 file
+        if step3_file.get('data') is not None:
+            filename, data = self.core_processor.remove_duplicates_bytes(
+                step3_file['data'], step3_file['filename']
+            )
+            return {'sheet_name': step3_file['sheet_name'], 'filename': filename, 'data': data}
+        
+        step4_path = self.core_processor.remove_duplicates(step3_file['file_path'])
+        
+        return {
+            'sheet_name': step3_file['sheet_name'],
+            'filename': Path(step4_path).name,
+            'file_path': step4_path
+        }
+    
+    def process_multiple_sheets_to_step4(self, step3_files: list,
+                                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                                         max_workers: Optional[int] = None) -> Dict[str, Any]:
         """
         Process multiple sheets from Step 3 to Step 4
         
+        Sheets are processed concurrently; results keep the input order.
+        
         Args:
-            step3_files: List of Step 3 files to process
+            step3_files: List of Step 3 files to process; entries carrying in-memory
+                'data' produce in-memory Step 4 entries, others are read from 'file_path'
+            progress_callback: Optional callback(done, total) invoked as sheets finish
+            max_workers: Thread count override (default: up to 8, bounded by CPUs and sheets)
             
         Returns:
             Dictionary with results and Step 4 file paths
@@ -42,23 +74,20 @@ class Step4DuplicateRemover:
             'total_sheets': len(step3_files)
         }
         
-        for step3_file in step3_files:
-            try:
-                sheet_name = step3_file['sheet_name']
-                step3_path = step3_file['file_path']
-                
-                # Remove duplicates from Step 3 file
-                step4_path = self.core_processor.remove_duplicates(step3_path)
-                
+        outcomes = run_per_sheet(
+            self.process_single_sheet,
+            step3_files,
+            max_workers=max_workers,
+            progress_callback=progress_callback
+        )
+        
+        for step3_file, (step4_file, error) in zip(step3_files, outcomes):
+            if error is None:
                 results['success_count'] += 1
-                results['step4_files'].append({
-                    'sheet_name': sheet_name,
-                    'filename': Path(step4_path).name,
-                    'file_path': step4_path
-                })
-                
-            except Exception as e:
-                logging.error(f"Error processing Step 4 for sheet '{sheet_name}': {str(e)}")
+                results['step4_files'].append(step4_file)
+            else:
+                sheet_name = step3_file['sheet_name']
+                logging.error(f"Error processing Step 4 for sheet '{sheet_name}': {str(error)}")
                 results['failed_count'] += 1
                 results['failed_sheets'].append(sheet_name)
         
@@ -9,10 +9,68 @@ from pathlib import Path
 import time
 import logging
 from datetime import datetime
+from functools import lru_cache
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+
+# Additional JavaScript to hide Streamlit Cloud elements
+_HIDE_STREAMLIT_JS = """
+    <script>
+    function hideStreamlitCloudElements() {
+        const elementsToHide = [
+            '[data-testid="stToolbar"]',
+            '[data-testid="stHeader"]', 
+            '[data-testid="stDecoration"]',
+            'header[data-testid="stHeader"]',
+            'button[title="View app source on GitHub"]',
+            'button[aria-label="Share"]',
+            'button[aria-label="Star"]', 
+            'button[aria-label="Edit"]',
+            '[data-testid="manage-app-button"]',
+            'a[href*="github.com"]',
+            '.stToolbar'
+        ];
+        
+        elementsToHide.forEach(selector => {
+            const elements = document.querySelectorAll(selector);
+            elements.forEach(el => {
+                if (el) {
+                    el.style.display = 'none !important';
+                    el.style.visibility = 'hidden !important';
+                    el.remove();
+                }
+            });
+        });
+    }
+    
+    hideStreamlitCloudElements();
+    setTimeout(hideStreamlitCloudElements, 100);
+    setTimeout(hideStreamlitCloudElements, 500);
+    
+    const observer = new MutationObserver(hideStreamlitCloudElements);
+    observer.observe(document.body, {
+        childList: true,
+        subtree: true,
+        attributes: true
+    });
+    
+    setInterval(hideStreamlitCloudElements, 1000);
+    </script>
+    """
+
+
+@lru_cache(maxsize=None)
+def _build_style_payload(hide_streamlit_branding: bool) -> str:
+    """Concatenate the UI kit CSS (and optional branding-hider JS) once per process"""
+    from .styles import get_custom_css
+    
+    if hide_streamlit_branding:
+        return get_custom_css() + _HIDE_STREAMLIT_JS
+    return get_custom_css()
+
+
 class TSSUIKit:
     """Main UI Kit class containing all reusable components"""
     
@@ -38,60 +96,14 @@ class TSSUIKit:
         """
         Inject custom CSS styling into Streamlit app
         
+        The styles must be emitted on every rerun (Streamlit drops elements
+        that a run does not re-create), so the payload is built once per
+        process and sent as a single markdown element.
+        
         Args:
             hide_streamlit_branding: Whether to hide Streamlit Cloud elements
         """
-        from .styles import get_custom_css
-        
-        # Inject main CSS
-        st.markdown(get_custom_css(), unsafe_allow_html=True)
-        
-        if hide_streamlit_branding:
-            # Additional JavaScript to hide Streamlit Cloud elements
-            hide_streamlit_js = """
-            <script>
-            function hideStreamlitCloudElements() {
-                const elementsToHide = [
-                    '[data-testid="stToolbar"]',
-                    '[data-testid="stHeader"]', 
-                    '[data-testid="stDecoration"]',
-                    'header[data-testid="stHeader"]',
-                    'button[title="View app source on GitHub"]',
-                    'button[aria-label="Share"]',
-                    'button[aria-label="Star"]', 
-                    'button[aria-label="Edit"]',
-                    '[data-testid="manage-app-button"]',
-                    'a[href*="github.com"]',
-                    '.stToolbar'
-                ];
-                
-                elementsToHide.forEach(selector => {
-                    const elements = document.querySelectorAll(selector);
-                    elements.forEach(el => {
-                        if (el) {
-                            el.style.display = 'none !important';
-                            el.style.visibility = 'hidden !important';
-                            el.remove();
-                        }
-                    });
-                });
-            }
-            
-            hideStreamlitCloudElements();
-            setTimeout(hideStreamlitCloudElements, 100);
-            setTimeout(hideStreamlitCloudElements, 500);
-            
-            const observer = new MutationObserver(hideStreamlitCloudElements);
-            observer.observe(document.body, {
-                childList: true,
-                subtree: true,
-                attributes: true
-            });
-            
-            setInterval(hideStreamlitCloudElements, 1000);
-            </script>
-            """
-            st.markdown(hide_streamlit_js, unsafe_allow_html=True)
+        st.markdown(_build_style_payload(hide_streamlit_branding), unsafe_allow_html=True)
 
     def render_app_header(self, title: str, subtitle: Optional[str] = None, 
                          icon: str = "📊", compact: bool = False, show_line: bool = False):
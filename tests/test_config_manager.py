@@ -0,0 +1,22 @@
+"""Tests for configuration loading."""
+
+import json
+import shutil
+
+from modules.core.config_manager import ConfigManager
+
+
+def test_config_fingerprint_follows_config_contents(tmp_path):
+    for name in ("template_config.json", "processing_config.json"):
+        shutil.copy(ConfigManager.DEFAULT_CONFIG_DIR / name, tmp_path / name)
+    config_dir = str(tmp_path)
+    original = ConfigManager.get_config_fingerprint(config_dir)
+    assert ConfigManager.get_config_fingerprint(config_dir) == original
+
+    processing_path = tmp_path / "processing_config.json"
+    processing = json.loads(processing_path.read_text(encoding="utf-8"))
+    processing["step4_config"]["max_columns"] += 1
+    processing_path.write_text(json.dumps(processing), encoding="utf-8")
+    ConfigManager.reload_configs()
+
+    assert ConfigManager.get_config_fingerprint(config_dir) != original
@@ -0,0 +1,63 @@
+"""Tests for the fused per-sheet pipeline."""
+
+import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from modules.core.config_manager import ConfigManager
+from modules.core.pipeline import CorePipeline
+from modules.core.workbook_io import load_workbook_bytes
+
+DATA_START_ROW = ConfigManager.get_template_config()["layout"]["data_start_row"]
+
+
+def _source_frame() -> pd.DataFrame:
+    """A minimal source sheet: article info, the Step 3 header and three data rows (one duplicate)."""
+    rows = [[None] * 30 for _ in range(12)]
+    rows[0][:2] = ["Product name:", "CASE 1"]
+    rows[1][:2] = ["Article number:", "101"]
+    rows[4][0] = "CẤU THÀNH SẢN PHẨM"
+    for row_idx, (kind, part) in zip((7, 8, 9), [("component", 1), ("material", 2), ("component", 1)]):
+        row = rows[row_idx]
+        row[:4] = [kind, f"Part {part}", "PP", "Supplier"]
+        row[8] = "I"
+        row[9] = datetime.datetime(2024, 5, part)
+        row[11], row[12] = "L", str(part)
+        row[13], row[14] = "N", "O"
+        row[18] = "SD" if part == 1 else "ND"
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_missing_sheet_is_reported_as_failed(tmp_path, use_processes):
+    sheets_data = {"A": _source_frame(), "B": _source_frame()}
+
+    results = CorePipeline(str(tmp_path)).process_sheets(
+        sheets_data, "source.xlsx", sheet_names=["A", "Missing", "B"],
+        in_memory=True, use_processes=use_processes,
+    )
+
+    assert results['success_count'] == 2
+    assert results['failed_sheets'] == ["Missing"]
+    assert [entry['sheet_name'] for entry in results['step4_files']] == ["A", "B"]
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_in_memory_output_matches_saved_output(tmp_path, use_processes):
+    sheets_data = {"A": _source_frame(), "B": _source_frame()}
+    pipeline = CorePipeline(str(tmp_path))
+
+    saved = pipeline.process_sheets(sheets_data, "source.xlsx", use_processes=use_processes)
+    in_memory = pipeline.process_sheets(sheets_data, "source.xlsx", in_memory=True, use_processes=use_processes)
+
+    assert saved['success_count'] == in_memory['success_count'] == 2
+    for saved_entry, memory_entry in zip(saved['step4_files'], in_memory['step4_files']):
+        assert saved_entry['filename'] == memory_entry['filename']
+        saved_ws = openpyxl.load_workbook(saved_entry['file_path']).active
+        memory_ws = load_workbook_bytes(memory_entry['data']).active
+        assert list(saved_ws.values) == list(memory_ws.values)
+        # Two unique data rows survive Step 4, dates intact
+        data_dates = [row[5] for row in saved_ws.iter_rows(min_row=DATA_START_ROW, values_only=True)]
+        assert data_dates == [datetime.datetime(2024, 5, 1), datetime.datetime(2024, 5, 2)]
@@ -0,0 +1,24 @@
+"""Tests for ZIP export."""
+
+import io
+import zipfile
+
+from modules.exporter import FileExporter
+
+
+def test_zip_round_trip_from_memory_and_disk(tmp_path):
+    on_disk = tmp_path / "b.xlsx"
+    on_disk.write_bytes(b"disk bytes")
+    file_list = [
+        {'sheet_name': "A", 'filename': "a.xlsx", 'data': b"memory bytes"},
+        {'sheet_name': "B", 'filename': "b.xlsx", 'file_path': str(on_disk)},
+        {'sheet_name': "C", 'filename': "c.csv", 'data': b"x,y\n"},
+    ]
+
+    archive = zipfile.ZipFile(io.BytesIO(FileExporter().create_zip_download(file_list)))
+
+    assert archive.read("a.xlsx") == b"memory bytes"
+    assert archive.read("b.xlsx") == b"disk bytes"
+    # Excel members are stored as-is; anything else is deflated
+    assert archive.getinfo("a.xlsx").compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo("c.csv").compress_type == zipfile.ZIP_DEFLATED
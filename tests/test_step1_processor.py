@@ -0,0 +1,15 @@
+"""Tests for the Step 1 template converter."""
+
+from modules.step1_processor import TemplateConverter
+
+
+def test_rejected_sheet_names_suggest_a_usable_name(tmp_path):
+    results = TemplateConverter(str(tmp_path)).create_multiple_templates(
+        ["Q1/2024", "Valid", "Valid"], "source.xlsx", in_memory=True
+    )
+
+    assert results.success_count == 1
+    assert results.failed_sheets == ["Q1/2024", "Valid"]
+    assert results.failure_reasons["Q1/2024"].endswith("— try 'Q1-2024'")
+    # A duplicate has no cleaned-up name to offer
+    assert results.failure_reasons["Valid"] == "duplicate sheet name"
@@ -0,0 +1,28 @@
+"""Tests for Step 3 data transfer."""
+
+import openpyxl
+
+from modules.core.config_manager import ConfigManager
+from modules.core.step3 import CoreStep3DataTransfer
+
+DATA_START_ROW = ConfigManager.get_template_config()["layout"]["data_start_row"]
+
+
+def test_mapped_rows_start_at_data_start_row_below_existing_cells():
+    ws = openpyxl.Workbook().active
+    # A cell far below the header must not shift where data rows land
+    ws.cell(DATA_START_ROW + 5, 30, "note")
+    data_rows = [
+        ["component", "Part 1", "PP", "Supplier", "", "", "", "", "I", "J", "", "L", "1"],
+        ["material", "Part 2"],
+    ]
+
+    written = CoreStep3DataTransfer()._transfer_mapped_data(ws, data_rows, header_row=0)
+
+    assert written == [DATA_START_ROW, DATA_START_ROW + 1]
+    assert [ws.cell(DATA_START_ROW, col).value for col in range(1, 7)] == [
+        "component", "Part 1", "PP", "Supplier", "I", "J"
+    ]
+    # L+M combine into column I
+    assert ws.cell(DATA_START_ROW, 9).value == "L-1"
+    assert ws.cell(DATA_START_ROW + 1, 2).value == "Part 2"
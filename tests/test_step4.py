@@ -0,0 +1,133 @@
+"""Tests for Step 4 duplicate removal."""
+
+import datetime
+import gc
+import weakref
+
+import openpyxl
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+from modules.core.config_manager import ConfigManager
+from modules.core.step4 import CoreStep4DuplicateRemover
+from modules.core.workbook_io import load_workbook_bytes, workbook_to_bytes
+
+LAYOUT = ConfigManager.get_template_config()["layout"]
+HEADER_ROW = LAYOUT["header_row"]
+DATA_START_ROW = LAYOUT["data_start_row"]
+
+
+def _roundtrip(ws):
+    """Build the Step 4 workbook for ws and reload it as a normal workbook."""
+    new_wb = CoreStep4DuplicateRemover().build_deduplicated_workbook(ws)
+    return load_workbook_bytes(workbook_to_bytes(new_wb)).active
+
+
+def test_unstyled_cells_are_copied():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    # Plain values never touched by a style setter
+    ws.cell(HEADER_ROW, 1, "Header")
+    ws.cell(DATA_START_ROW, 1, "Plain")
+    ws.cell(DATA_START_ROW, 2, 42)
+    assert not any(cell.has_style for row in ws.iter_rows() for cell in row)
+
+    result = _roundtrip(ws)
+
+    assert result.cell(HEADER_ROW, 1).value == "Header"
+    assert result.cell(DATA_START_ROW, 1).value == "Plain"
+    assert result.cell(DATA_START_ROW, 2).value == 42
+
+
+def test_styles_and_date_formats_are_copied():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    bold = Font(bold=True, color="FF0000")
+    fill = PatternFill("solid", fgColor="FFFF00")
+    border = Border(left=Side(style="thin"))
+    ws.cell(HEADER_ROW, 1, "Header").font = bold
+    ws.cell(HEADER_ROW, 1).alignment = Alignment(text_rotation=90)
+    # Same style on a text cell and on later date cells: the dates hit the style cache
+    for col, value in enumerate(["Text", datetime.datetime(2024, 5, 17), datetime.datetime(2024, 6, 1)], 1):
+        cell = ws.cell(DATA_START_ROW, col, value)
+        cell.font = bold
+        cell.fill = fill
+        cell.border = border
+
+    result = _roundtrip(ws)
+
+    header = result.cell(HEADER_ROW, 1)
+    assert header.font.bold and header.font.color.rgb == "00FF0000"
+    assert header.alignment.text_rotation == 90
+    for col in range(1, 4):
+        cell = result.cell(DATA_START_ROW, col)
+        assert cell.font.bold
+        assert cell.fill.fgColor.rgb == "00FFFF00"
+        assert cell.border.left.style == "thin"
+    assert result.cell(DATA_START_ROW, 2).value == datetime.datetime(2024, 5, 17)
+    assert result.cell(DATA_START_ROW, 2).is_date
+    assert result.cell(DATA_START_ROW, 3).value == datetime.datetime(2024, 6, 1)
+    assert result.cell(DATA_START_ROW, 3).is_date
+
+
+def test_remove_duplicates_end_to_end(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Template"
+    ws.cell(1, 18, "Article").alignment = Alignment(text_rotation=90)
+    ws.merge_cells("R1:R9")
+    ws.merge_cells("A5:C5")
+    ws.cell(HEADER_ROW, 1, "Combination").font = Font(bold=True)
+    ws.cell(HEADER_ROW, 28, "Beyond Z")
+    ws.column_dimensions["B"].width = 31
+    ws.column_dimensions["AB"].width = 17
+    rows = [
+        ["component", "Part 1", datetime.datetime(2024, 5, 1), 1.5],
+        ["material", "Part 2", datetime.datetime(2024, 5, 2), 2],
+        ["component", "Part 1", datetime.datetime(2024, 5, 1), 1.5],
+    ]
+    for row_idx, values in enumerate(rows, DATA_START_ROW):
+        for col, value in enumerate(values, 1):
+            ws.cell(row_idx, col, value)
+    step3_path = tmp_path / "source - Sheet1 - Step3.xlsx"
+    wb.save(step3_path)
+
+    remover = CoreStep4DuplicateRemover(output_dir=str(tmp_path / "out"))
+    step4_path = remover.remove_duplicates(str(step3_path))
+
+    assert step4_path == str(tmp_path / "out" / "source - Sheet1 - Step4.xlsx")
+    result = openpyxl.load_workbook(step4_path).active
+    assert {str(merged) for merged in result.merged_cells.ranges} == {"R1:R9", "A5:C5"}
+    assert result.column_dimensions["B"].width == 31
+    assert result.column_dimensions["AB"].width == 17
+    assert result.cell(1, 18).alignment.text_rotation == 90
+    assert result.cell(HEADER_ROW, 1).font.bold
+    assert result.cell(HEADER_ROW, 28).value == "Beyond Z"
+    # The duplicate third row is dropped and column A is renamed
+    data = [
+        list(values)
+        for values in result.iter_rows(min_row=DATA_START_ROW, max_col=4, values_only=True)
+    ]
+    assert data == [
+        ["Comp", "Part 1", datetime.datetime(2024, 5, 1), 1.5],
+        ["Mat", "Part 2", datetime.datetime(2024, 5, 2), 2],
+    ]
+    assert result.cell(DATA_START_ROW, 3).is_date
+
+    # The in-memory variant produces the same sheet
+    filename, data_bytes = remover.remove_duplicates_bytes(step3_path.read_bytes(), step3_path.name)
+    assert filename == "source - Sheet1 - Step4.xlsx"
+    in_memory = load_workbook_bytes(data_bytes).active
+    assert list(in_memory.values) == list(result.values)
+
+
+def test_output_does_not_keep_the_source_workbook_alive():
+    wb = openpyxl.Workbook()
+    wb.active.cell(DATA_START_ROW, 1, "Part").font = Font(bold=True)
+    source_ref = weakref.ref(wb)
+
+    new_wb = CoreStep4DuplicateRemover().build_deduplicated_workbook(wb.active)
+    del wb
+    gc.collect()
+
+    assert source_ref() is None
+    assert new_wb is not None
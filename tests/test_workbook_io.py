@@ -0,0 +1,22 @@
+"""Tests for shared workbook reading helpers."""
+
+import io
+
+import openpyxl
+
+from modules.core.workbook_io import read_sheet_frame, workbook_to_bytes
+
+
+def test_read_sheet_frame_leaves_stream_position_alone():
+    wb = openpyxl.Workbook()
+    wb.active.title = "Data"
+    wb.active.append(["a", 1])
+    stream = io.BytesIO(workbook_to_bytes(wb))
+    # Another worker has read the stream to its end
+    stream.seek(0, io.SEEK_END)
+    position = stream.tell()
+
+    df = read_sheet_frame(stream, "Data")
+
+    assert df.values.tolist() == [["a", 1]]
+    assert stream.tell() == position
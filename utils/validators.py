@@ -3,14 +3,16 @@ Validators Module
 Contains validation functions for the TSS Converter web application.
 """
 
-import pandas as pd
 from pathlib import Path
 from typing import Tuple, Optional, Dict, Any
-import tempfile
-import os
+import zipfile
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 import logging
 
+# File signatures: .xlsx is a ZIP container, legacy .xls is an OLE2 compound file
+XLSX_MAGIC = b'PK\x03\x04'
+XLS_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
 class FileValidator:
     """Handles validation of uploaded files and data"""
     
@@ -113,6 +115,10 @@ class FileValidator:
         """
         Validate file is a valid Excel format that can be read
         
+        Only the container is inspected: the magic bytes, plus the ZIP
+        central directory for .xlsx. The workbook itself is parsed once,
+        later, by the processing pipeline.
+        
         Args:
             uploaded_file: Streamlit uploaded file object
             
@@ -120,37 +126,31 @@ class FileValidator:
             Tuple of (is_valid, message)
         """
         try:
-            # Create temporary file to test reading
             file_ext = Path(uploaded_file.name).suffix.lower()
             
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_file.flush()
+            uploaded_file.seek(0)
+            magic = uploaded_file.read(8)
+            uploaded_file.seek(0)
+            
+            if file_ext == '.xlsx':
+                if not magic.startswith(XLSX_MAGIC):
+                    return False, "Cannot read Excel file: not a valid .xlsx (ZIP) container"
                 
                 try:
-                    # Try to read the file
-                    engine = 'openpyxl' if file_ext == '.xlsx' else 'xlrd'
-                    sheets_dict = pd.read_excel(
-                        tmp_file.name,
-                        sheet_name=None,
-                        engine=engine
-                    )
-                    
-                    # Clean up temp file
-                    os.unlink(tmp_file.name)
-                    
-                    # Check if we got any sheets
-                    if not sheets_dict:
-                        return False, "No sheets found in Excel file"
-                    
-                    return True, f"Excel format valid ({len(sheets_dict)} sheets found)"
-                    
-                except Exception as read_error:
-                    # Clean up temp file
-                    if os.path.exists(tmp_file.name):
-                        os.unlink(tmp_file.name)
-                    return False, f"Cannot read Excel file: {str(read_error)}"
-                    
+                    names = self._get_xlsx_namelist(uploaded_file)
+                except zipfile.BadZipFile as zip_error:
+                    return False, f"Cannot read Excel file: {str(zip_error)}"
+                
+                if 'xl/workbook.xml' not in names:
+                    return False, "Cannot read Excel file: workbook part missing"
+                
+                return True, "Excel format valid"
+            
+            if not magic.startswith(XLS_MAGIC):
+                return False, "Cannot read Excel file: not a valid .xls (OLE2) container"
+            
+            return True, "Excel format valid"
+            
         except Exception as e:
             return False, f"Error validating Excel format: {str(e)}"
     
@@ -158,6 +158,9 @@ class FileValidator:
         """
         Validate the content of the Excel file
         
+        Checks the sheet count from workbook metadata without loading any
+        cell data. Empty sheets are filtered after the pipeline's single parse.
+        
         Args:
             uploaded_file: Streamlit uploaded file object
             
@@ -167,49 +170,41 @@ class FileValidator:
         try:
             file_ext = Path(uploaded_file.name).suffix.lower()
             
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_file.flush()
-                
-                try:
-                    engine = 'openpyxl' if file_ext == '.xlsx' else 'xlrd'
-                    sheets_dict = pd.read_excel(
-                        tmp_file.name,
-                        sheet_name=None,
-                        engine=engine
+            try:
+                if file_ext == '.xlsx':
+                    sheet_count = sum(
+                        1 for name in self._get_xlsx_namelist(uploaded_file)
+                        if name.startswith('xl/worksheets/') and name.endswith('.xml')
                     )
-                    
-                    # Clean up temp file
-                    os.unlink(tmp_file.name)
-                    
-                    # Validate number of sheets
-                    sheet_count = len(sheets_dict)
-                    if sheet_count < self.min_sheets:
-                        return False, f"Too few sheets ({sheet_count}). Minimum: {self.min_sheets}"
-                    
-                    if sheet_count > self.max_sheets:
-                        return False, f"Too many sheets ({sheet_count}). Maximum: {self.max_sheets}"
-                    
-                    # Check for non-empty sheets
-                    non_empty_sheets = []
-                    for sheet_name, df in sheets_dict.items():
-                        if not df.empty and not df.isnull().all().all():
-                            non_empty_sheets.append(sheet_name)
-                    
-                    if not non_empty_sheets:
-                        return False, "No non-empty sheets found in the Excel file"
-                    
-                    return True, f"Content validation passed ({len(non_empty_sheets)} non-empty sheets)"
-                    
-                except Exception as content_error:
-                    # Clean up temp file
-                    if os.path.exists(tmp_file.name):
-                        os.unlink(tmp_file.name)
-                    return False, f"Error validating content: {str(content_error)}"
-                    
+                else:
+                    import xlrd
+                    book = xlrd.open_workbook(file_contents=uploaded_file.getvalue(), on_demand=True)
+                    sheet_count = book.nsheets
+                    book.release_resources()
+            except Exception as content_error:
+                return False, f"Error validating content: {str(content_error)}"
+            
+            # Validate number of sheets
+            if sheet_count < self.min_sheets:
+                return False, f"Too few sheets ({sheet_count}). Minimum: {self.min_sheets}"
+            
+            if sheet_count > self.max_sheets:
+                return False, f"Too many sheets ({sheet_count}). Maximum: {self.max_sheets}"
+            
+            return True, f"Content validation passed ({sheet_count} sheets)"
+            
         except Exception as e:
             return False, f"Error during content validation: {str(e)}"
     
+    def _get_xlsx_namelist(self, uploaded_file: UploadedFile) -> list:
+        """Read the member names from the ZIP central directory and rewind the upload"""
+        try:
+            uploaded_file.seek(0)
+            with zipfile.ZipFile(uploaded_file) as archive:
+                return archive.namelist()
+        finally:
+            uploaded_file.seek(0)
+    
     def get_validation_summary(self, uploaded_file: UploadedFile) -> Dict[str, Any]:
         """
         Get comprehensive validation summary